@@ -0,0 +1,170 @@
+# PEER app map geometries
+# Converts school district and legislative district boundary files into the
+# compact files the app's map reads. Each layer is simplified once per zoom level
+# here, at build time, so the app never touches full resolution shapes.
+#
+# Building needs geopandas and shapely (not needed to run the app):
+#   pip install geopandas shapely
+#
+# Usage: python build_geometries.py school_districts il_unified.shp --key-field RCDTS
+#        python build_geometries.py school_districts il_unified.shp --key-field GEOID --crosswalk nces_rcdts.csv
+#        python build_geometries.py house il_house.shp --key-field DISTRICT
+#        python build_geometries.py senate il_senate.shp --key-field DISTRICT
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+GEOMETRY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "geometries")
+
+# Layers and the key each feature is joined on in the app
+
+MAP_LAYERS = {
+    "school_districts": "RCDTS",
+    "house": "District Number",
+    "senate": "District Number",
+}
+
+# Simplification tolerance per zoom level, in degrees (0.001 is roughly 100 m)
+
+ZOOM_LEVELS = {
+    "statewide": 0.005,
+    "regional": 0.001,
+    "detailed": 0.0002,
+}
+
+# Coordinates are stored as integers in units of 1e-5 degrees (about 1 m)
+
+COORDINATE_SCALE = 100_000
+
+
+def geometry_path(layer, zoom):
+    return os.path.join(GEOMETRY_DIR, f"{layer}_{zoom}.npz")
+
+
+def simplify_layer(geometries, tolerance):
+    """Simplify a layer's polygons, keeping shared boundaries shared.
+
+    shapely's coverage simplification moves each shared edge once, so
+    neighboring districts stay gap and overlap free. Older shapely versions fall
+    back to per-polygon topology preserving simplification.
+    """
+    import shapely
+
+    if hasattr(shapely, "coverage_simplify"):
+        return shapely.coverage_simplify(geometries, tolerance)
+    return shapely.simplify(geometries, tolerance, preserve_topology=True)
+
+
+def encode_layer(keys, geometries):
+    """Pack polygons into flat arrays: quantized coordinates plus offset arrays"""
+    import shapely
+
+    # Store everything as MultiPolygons so every feature has the same nesting
+
+    geometries = np.array([
+        geometry if geometry.geom_type == "MultiPolygon" else shapely.MultiPolygon([geometry])
+        for geometry in geometries
+    ], dtype=object)
+    _, coords, (ring_offsets, polygon_offsets, feature_offsets) = shapely.to_ragged_array(geometries)
+    return {
+        "keys": np.asarray(keys, dtype=str),
+        "coords": np.round(coords * COORDINATE_SCALE).astype(np.int32),
+        "ring_offsets": ring_offsets.astype(np.int32),
+        "polygon_offsets": polygon_offsets.astype(np.int32),
+        "feature_offsets": feature_offsets.astype(np.int32),
+    }
+
+
+def load_geojson(layer, zoom):
+    """Read a built layer as a GeoJSON FeatureCollection (feature ids are the keys).
+
+    Returns None if the layer has not been built. Only needs numpy.
+    """
+    path = geometry_path(layer, zoom)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        keys = data["keys"]
+        coords = (data["coords"] / COORDINATE_SCALE).round(5).tolist()
+        ring_offsets = data["ring_offsets"]
+        polygon_offsets = data["polygon_offsets"]
+        feature_offsets = data["feature_offsets"]
+
+    features = []
+    for i, key in enumerate(keys):
+        polygons = []
+        for p in range(feature_offsets[i], feature_offsets[i + 1]):
+            polygons.append([
+                coords[ring_offsets[r]:ring_offsets[r + 1]]
+                for r in range(polygon_offsets[p], polygon_offsets[p + 1])
+            ])
+        features.append({
+            "type": "Feature",
+            "id": str(key),
+            "properties": {},
+            "geometry": {"type": "MultiPolygon", "coordinates": polygons},
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def read_boundaries(source, key_field, crosswalk=None, crosswalk_from=None, crosswalk_to="RCDTS", layer="school_districts"):
+    """Read a boundary file, reproject to longitude/latitude and return (keys, geometries)"""
+    import geopandas as gpd
+
+    boundaries = gpd.read_file(source).to_crs(epsg=4326)
+    keys = boundaries[key_field].astype(str)
+
+    # Census school district files are keyed by NCES id. A crosswalk CSV maps
+    # them to RCDTS so they join to the wide table.
+
+    if crosswalk:
+        mapping = pd.read_csv(crosswalk, dtype=str)
+        lookup = dict(zip(mapping[crosswalk_from or key_field], mapping[crosswalk_to]))
+        keys = keys.map(lookup)
+    keep = keys.notna().to_numpy() & boundaries.geometry.notna().to_numpy()
+
+    # Legislative district numbers drop their leading zeros ("007" -> "7"). RCDTS
+    # keep theirs: a key field stored as a number loses region 01-09's leading
+    # zero, so it is padded back to 13 characters.
+
+    keys = keys[keep]
+    if MAP_LAYERS[layer] == "RCDTS":
+        keys = keys.str.zfill(13)
+    elif keys.str.isdigit().all():
+        keys = keys.astype(int).astype(str)
+    return keys.to_numpy(), boundaries.geometry[keep].to_numpy()
+
+
+def build_layer(layer, keys, geometries):
+    """Write one file per zoom level and return their paths"""
+    os.makedirs(GEOMETRY_DIR, exist_ok=True)
+    paths = []
+    for zoom, tolerance in ZOOM_LEVELS.items():
+        encoded = encode_layer(keys, simplify_layer(geometries, tolerance))
+        path = geometry_path(layer, zoom)
+        np.savez_compressed(path, **encoded)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build simplified map geometries for the PEER app.")
+    parser.add_argument("layer", choices=list(MAP_LAYERS))
+    parser.add_argument("source", help="boundary file readable by geopandas (shapefile, GeoJSON, GeoPackage)")
+    parser.add_argument("--key-field", required=True, help="field holding RCDTS or the legislative district number")
+    parser.add_argument("--crosswalk", help="CSV mapping --crosswalk-from ids to RCDTS")
+    parser.add_argument("--crosswalk-from", help="crosswalk column matching --key-field (default: same name)")
+    parser.add_argument("--crosswalk-to", default="RCDTS")
+    args = parser.parse_args()
+
+    keys, geometries = read_boundaries(args.source, args.key_field, args.crosswalk, args.crosswalk_from, args.crosswalk_to,
+                                       layer=args.layer)
+    for path in build_layer(args.layer, keys, geometries):
+        print(f"Wrote {len(keys):,} features to {path} ({os.path.getsize(path) / 1024:,.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+# PEER app legislative district coverage
+# Builds leg_dist_coverage.csv, the share of each school district's students in
+# each House and Senate district, from where its schools are. The Directory of
+# Educational Entities sometimes places only a district's office in a legislative
+# district (see todo.md); here every school is placed at its own coordinates and
+# counted with its enrollment. Schools are assigned to legislative districts with
+# a spatial index (shapely's STRtree) over the district polygons.
+#
+# Building needs geopandas and shapely, like build_geometries.py (not needed to run
+# the app). The new table is checked with validate_data.py and only used if it
+# passes: it is published with the live wide table as a new release (see
+# validate_data.py), or written to --output for review.
+#
+# Usage: python build_leg_coverage.py --schools schools.csv --house il_house.shp --senate il_senate.shp --key-field DISTRICT
+#        python build_leg_coverage.py --schools dee_schools.csv --report-card rc24_schools.csv \
+#                                     --house il_house.shp --senate il_senate.shp --key-field DISTRICT --output new/leg_dist_coverage.csv
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from build_geometries import read_boundaries
+from build_school_partitions import REPORT_CARD_COLUMNS, district_key, read_extract
+from validate_data import COVERAGE_COLUMNS, live_data_files, publish, validate
+
+# Share of Students is stored rounded, as in the hand-built table
+
+SHARE_DECIMALS = 2
+
+# Schools outside every polygon (on a boundary, or geocoded just off the shore or
+# the state line) go to the nearest district within this distance, in degrees
+
+MAX_NEAREST_DISTANCE = 0.02
+
+
+def read_school_points(schools_path, rcdts_field, lon_field, lat_field, enrollment_field, report_card=None):
+    """One row per school: RCDTS (no dashes), longitude, latitude and enrollment"""
+    if schools_path.lower().endswith((".xlsx", ".xls")):
+        schools = pd.read_excel(schools_path, dtype={rcdts_field: str})
+    else:
+        schools = pd.read_csv(schools_path, dtype={rcdts_field: str})
+    schools = schools.rename(columns={rcdts_field: "RCDTS", lon_field: "Longitude", lat_field: "Latitude"})
+    schools["RCDTS"] = schools["RCDTS"].str.replace("-", "")
+
+    # Enrollment from the Report Card school file, or from the schools file itself
+
+    if report_card:
+        enrollment_column = next(source for source, name in REPORT_CARD_COLUMNS.items() if name == "Enrollment")
+        enrollment = read_extract(report_card)[["RCDTS", enrollment_column]]
+        enrollment["RCDTS"] = enrollment["RCDTS"].str.replace("-", "")
+        schools = schools.merge(enrollment.rename(columns={enrollment_column: "Enrollment"}), on="RCDTS", how="left")
+    else:
+        schools = schools.rename(columns={enrollment_field: "Enrollment"})
+
+    schools = schools[["RCDTS", "Longitude", "Latitude", "Enrollment"]]
+    for column in ["Longitude", "Latitude", "Enrollment"]:
+        schools[column] = pd.to_numeric(schools[column], errors="coerce")
+    return schools
+
+
+def assign_points(longitudes, latitudes, keys, geometries):
+    """Key of the polygon containing each point (nearest polygon as a fallback, else None)"""
+    import shapely
+
+    points = shapely.points(longitudes, latitudes)
+    tree = shapely.STRtree(geometries)
+    assigned = np.full(len(points), None, dtype=object)
+
+    # A point on a shared boundary can fall in two polygons; the first one wins
+
+    point_index, polygon_index = tree.query(points, predicate="intersects")
+    point_index, first = np.unique(point_index, return_index=True)
+    assigned[point_index] = keys[polygon_index[first]]
+
+    outside = np.flatnonzero(pd.isna(assigned))
+    if len(outside):
+        point_index, polygon_index = tree.query_nearest(points[outside], max_distance=MAX_NEAREST_DISTANCE)
+        point_index, first = np.unique(point_index, return_index=True)
+        assigned[outside[point_index]] = keys[polygon_index[first]]
+    return assigned
+
+
+def build_coverage(schools, df, chambers, legislators):
+    """The coverage table (one row per legislative district and school district it
+    covers) and the number of located schools outside every district, per chamber.
+
+    chambers maps each chamber to (keys, geometries); legislators maps
+    (Chamber, District Number) to the legislator's name.
+    """
+    districts = df.assign(key=df["RCDTS"].map(district_key)).drop_duplicates("key").set_index("key")
+    schools = schools.assign(key=schools["RCDTS"].map(district_key))
+    schools = schools[schools["key"].isin(districts.index) & schools["Enrollment"].gt(0)]
+    schools = schools.assign(**{
+        "RCDTS": schools["key"].map(districts["RCDTS"]),
+        "School District": schools["key"].map(districts["District Name (IRC)"]),
+    })
+    district_totals = schools.groupby("RCDTS")["Enrollment"].sum()
+
+    # Schools without coordinates still count in their district's total, so its
+    # shares fall short of 1 and validate_data.py warns about it
+
+    schools = schools.dropna(subset=["Longitude", "Latitude"])
+    tables, unassigned = [], {}
+    for chamber, (keys, geometries) in chambers.items():
+        district_number = assign_points(schools["Longitude"].to_numpy(), schools["Latitude"].to_numpy(), keys, geometries)
+        unassigned[chamber] = int(pd.isna(district_number).sum())
+        covered = (schools.assign(**{"District Number": district_number})
+                   .dropna(subset=["District Number"])
+                   .groupby(["District Number", "RCDTS", "School District"], as_index=False)["Enrollment"].sum())
+        covered["District Number"] = covered["District Number"].astype(int)
+        covered["Chamber"] = chamber
+        tables.append(covered)
+
+    coverage = pd.concat(tables, ignore_index=True)
+    coverage["Legislator Name"] = [legislators.get(key) for key in zip(coverage["Chamber"], coverage["District Number"])]
+    coverage["Total Students"] = coverage["Enrollment"].round().astype(int)
+    coverage["Share of Students"] = (coverage["Enrollment"] / coverage["RCDTS"].map(district_totals)).round(SHARE_DECIMALS)
+
+    # Same order as the hand-built table: Senate, then House, by district
+
+    coverage = coverage.sort_values(["Chamber", "District Number", "School District"], ascending=[False, True, True])
+    return coverage[COVERAGE_COLUMNS].reset_index(drop=True), unassigned
+
+
+def read_legislators(path):
+    """{(Chamber, District Number): Legislator Name} from a CSV with those columns"""
+    names = pd.read_csv(path).drop_duplicates(["Chamber", "District Number"])
+    return dict(zip(zip(names["Chamber"], names["District Number"].astype(int)), names["Legislator Name"]))
+
+
+def write_coverage(coverage, path):
+    """Write the table with a rename, so the app never reads a partly written file"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    coverage.to_csv(tmp_path, index=False, encoding="utf-8-sig")
+    if os.path.exists(path):
+        os.chmod(tmp_path, os.stat(path).st_mode)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the PEER app's legislative district coverage table from school locations.")
+    parser.add_argument("--schools", required=True, help="school locations (CSV or Excel) with RCDTS, longitude, latitude")
+    parser.add_argument("--rcdts-field", default="RCDTS")
+    parser.add_argument("--lon-field", default="Longitude")
+    parser.add_argument("--lat-field", default="Latitude")
+    parser.add_argument("--enrollment-field", default="Enrollment", help="enrollment column in --schools (without --report-card)")
+    parser.add_argument("--report-card", help="Report Card school file to take enrollment from instead")
+    parser.add_argument("--house", required=True, help="House district boundaries readable by geopandas")
+    parser.add_argument("--senate", required=True, help="Senate district boundaries readable by geopandas")
+    parser.add_argument("--key-field", required=True, help="field holding the legislative district number")
+    live_wide, live_coverage = live_data_files()
+    parser.add_argument("--legislators", default=live_coverage, help="CSV of Chamber, District Number, Legislator Name (default: the current table)")
+    parser.add_argument("--wide", default=live_wide, help="wide table (Parquet) the districts are joined to")
+    parser.add_argument("--output", help="write the table here instead of publishing it")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = pd.read_parquet(args.wide)
+    schools = read_school_points(args.schools, args.rcdts_field, args.lon_field, args.lat_field,
+                                 args.enrollment_field, args.report_card)
+    chambers = {chamber: read_boundaries(source, args.key_field, layer=chamber.lower())
+                for chamber, source in [("House", args.house), ("Senate", args.senate)]}
+    coverage, unassigned = build_coverage(schools, df, chambers, read_legislators(args.legislators))
+    print(f"Read {len(schools):,} schools and assigned them in {time.perf_counter() - start:.1f}s "
+          f"(outside every district: {unassigned['House']:,} House, {unassigned['Senate']:,} Senate)")
+
+    result = validate(df, coverage)
+    for check in result["checks"]:
+        if check["failures"]:
+            print(f"{check['severity'].upper():7} {check['check']}: {check['failures']:,} failing ({check['description']})", file=sys.stderr)
+    if not result["passed"]:
+        print(f"{result['errors']} error(s). {args.output or 'Coverage'} not written.", file=sys.stderr)
+        sys.exit(1)
+    if args.output:
+        write_coverage(coverage, args.output)
+        print(f"Wrote {len(coverage):,} rows to {args.output}")
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "leg_dist_coverage.csv")
+        write_coverage(coverage, path)
+        print(f"Published {len(coverage):,} rows in {publish(args.wide, path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# PEER app school data
+# Builds the school-level data behind the district drill-down from local ISBE
+# extracts: the Illinois Report Card school file (enrollment and demographics) and,
+# optionally, an Educator Employment Information (EIS) extract of staff by school.
+# Schools are written one Parquet file per district, named by the district's code,
+# so the app only ever reads the selected district's schools.
+#
+# Usage: python build_school_partitions.py --report-card rc24_schools.csv
+#        python build_school_partitions.py --report-card rc24_schools.xlsx --eis eis24_staff.csv
+
+import argparse
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+SCHOOL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schools")
+
+# Report Card columns and the names the app uses (the wide table's names).
+# Percentages are 0-100 in the Report Card and fractions in the app.
+
+REPORT_CARD_COLUMNS = {
+    "RCDTS": "RCDTS",
+    "School Name": "School Name",
+    "School Type": "School Type",
+    "Grades Served": "Grades Served",
+    "# Student Enrollment": "Enrollment",
+    "% Student Enrollment - White": "White (%)",
+    "% Student Enrollment - Black or African American": "Black (%)",
+    "% Student Enrollment - Hispanic or Latino": "Latine (%)",
+    "% Student Enrollment - Asian": "Asian (%)",
+    "% Student Enrollment - Native Hawaiian or Other Pacific Islander": "Native Hawaiian or Other Pacific Islander (%)",
+    "% Student Enrollment - American Indian or Alaska Native": "American Indian or Alaska Native (%)",
+    "% Student Enrollment - Children with Disabilities": "IEP (%)",
+    "% Student Enrollment - EL": "EL (%)",
+    "% Student Enrollment - Low Income": "Low Income (%)",
+}
+PERCENT_COLUMNS = [name for name in REPORT_CARD_COLUMNS.values() if name.endswith("(%)")]
+
+# EIS staff extract: one row per school and position with FTE. Positions are
+# mapped to the staffing resources the app shows; others are ignored.
+
+EIS_COLUMNS = {"RCDTS": "RCDTS", "Position": "Position", "FTE": "FTE"}
+EIS_POSITIONS = {
+    "Teacher": "Core and Specialist Teachers",
+    "Special Education Teacher": "Special Education Teachers",
+    "Bilingual Teacher": "EL Teachers",
+    "School Counselor": "Counselors",
+    "School Nurse": "Nurses",
+    "School Psychologist": "Psychologists",
+    "Principal": "Principals",
+    "Assistant Principal": "Assistant Principals",
+}
+
+# RCDTS = Region (2) + County (3) + District (4) + Type (2) + School (4). The first
+# 11 characters are shared by a district's RCDTS in the wide table and its schools.
+
+DISTRICT_KEY_LENGTH = 11
+
+
+def district_key(rcdts):
+    """Partition key (region, county, district and type codes) of a district or school RCDTS"""
+    return rcdts.replace("-", "")[:DISTRICT_KEY_LENGTH]
+
+
+def school_partition_path(rcdts, school_dir=SCHOOL_DIR):
+    """Path of the schools file for the district with this RCDTS"""
+    return os.path.join(school_dir, f"{district_key(rcdts)}.parquet")
+
+
+def read_extract(path):
+    if path.lower().endswith((".xlsx", ".xls")):
+        return pd.read_excel(path, dtype={"RCDTS": str})
+    return pd.read_csv(path, dtype={"RCDTS": str})
+
+
+def read_schools(report_card, eis=None):
+    """One row per school: Report Card enrollment and demographics plus EIS staff FTE"""
+    schools = read_extract(report_card)
+    schools = schools[list(REPORT_CARD_COLUMNS)].rename(columns=REPORT_CARD_COLUMNS)
+    schools["RCDTS"] = schools["RCDTS"].str.replace("-", "", regex=False)
+    schools[PERCENT_COLUMNS] = schools[PERCENT_COLUMNS].apply(pd.to_numeric, errors="coerce") / 100
+    schools["Enrollment"] = pd.to_numeric(schools["Enrollment"], errors="coerce")
+
+    if eis:
+        staff = read_extract(eis)[list(EIS_COLUMNS)].rename(columns=EIS_COLUMNS)
+        staff["RCDTS"] = staff["RCDTS"].str.replace("-", "", regex=False)
+        staff["Position"] = staff["Position"].map(EIS_POSITIONS)
+        staff = staff.dropna(subset=["Position"]).pivot_table(
+            index="RCDTS", columns="Position", values="FTE", aggfunc="sum", fill_value=0)
+        staff = staff.reindex(columns=list(EIS_POSITIONS.values()), fill_value=0)
+        schools = schools.merge(staff, left_on="RCDTS", right_index=True, how="left")
+    return schools
+
+
+def build_partitions(schools, school_dir=SCHOOL_DIR):
+    """Write one file per district and return the number of districts.
+
+    The files are written to a new directory that replaces school_dir at the end,
+    so the app never sees a mix of old and new districts. The old directory is
+    renamed aside before the new one is renamed into place and only deleted
+    afterwards, so school_dir is missing just between the two renames rather than
+    for the whole delete.
+    """
+    parent = os.path.dirname(os.path.abspath(school_dir))
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix=".schools_")
+    keys = schools["RCDTS"].map(district_key)
+    for key, district_schools in schools.groupby(keys):
+        district_schools.sort_values("School Name").to_parquet(os.path.join(tmp_dir, f"{key}.parquet"), index=False)
+    os.chmod(tmp_dir, 0o755)
+    old_dir = None
+    if os.path.isdir(school_dir):
+        old_dir = tempfile.mkdtemp(dir=parent, prefix=".schools_old_")
+        os.replace(school_dir, os.path.join(old_dir, "schools"))
+    os.replace(tmp_dir, school_dir)
+    if old_dir:
+        shutil.rmtree(old_dir)
+    return keys.nunique()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the per-district school files for the PEER app.")
+    parser.add_argument("--report-card", required=True, help="Illinois Report Card school-level file (CSV or Excel)")
+    parser.add_argument("--eis", help="EIS staff extract with RCDTS, Position and FTE columns (CSV or Excel)")
+    parser.add_argument("--out", default=SCHOOL_DIR, help="output directory")
+    args = parser.parse_args()
+
+    schools = read_schools(args.report_card, args.eis)
+    districts = build_partitions(schools, args.out)
+    print(f"Wrote {len(schools):,} schools in {districts:,} district files to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
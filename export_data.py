@@ -0,0 +1,115 @@
+# PEER app data exports
+# Builds CSV and Parquet exports of the app data as a stream of chunks. Run it
+# directly to write an export to disk a chunk at a time; the app's download buttons
+# join the chunks into one file, since Streamlit serves downloads from bytes.
+# Usage: python export_data.py --scope statewide --format CSV --out peer_statewide.csv
+#        python export_data.py --scope district --value "Payson CUSD 1" --format Parquet --out payson.parquet
+#        python export_data.py --scope legislative --value "House,12" --format CSV --out house_12.csv
+
+import argparse
+import io
+
+import pandas as pd
+
+# File extension and MIME type for each export format
+
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+# Rows written per chunk
+
+EXPORT_CHUNK_ROWS = 250
+
+
+def export_frame(df, df_leg, scope, value=None):
+    """Select the rows to export.
+
+    scope is "statewide" (every row of the wide table), "district" (value is a
+    district name), "legislative" (value is a (chamber, district number) pair)
+    or "legislator" (value is a legislator name). Legislative exports are the
+    coverage rows joined to the wide table, as shown in the Legislative View.
+    """
+    if scope == "statewide":
+        return df
+    if scope == "district":
+        return df[df['District Name (IRC)'] == value]
+    if scope == "legislative":
+        chamber, district_number = value
+        coverage = df_leg[(df_leg['Chamber'] == chamber) & (df_leg['District Number'] == int(district_number))]
+    elif scope == "legislator":
+        coverage = df_leg[df_leg['Legislator Name'] == value]
+    else:
+        raise ValueError(f"Unknown export scope: {scope}")
+    return coverage.merge(df, on="RCDTS", how="left")
+
+
+def iter_export_chunks(df_export, file_format, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield the export file as bytes, chunk_rows rows at a time"""
+    if file_format == "CSV":
+        yield df_export.iloc[:0].to_csv(index=False).encode("utf-8")
+        for start in range(0, len(df_export), chunk_rows):
+            chunk = df_export.iloc[start:start + chunk_rows]
+            yield chunk.to_csv(index=False, header=False).encode("utf-8")
+    elif file_format == "Parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # Each row group is flushed from the buffer as soon as it is written
+
+        schema = pa.Schema.from_pandas(df_export, preserve_index=False)
+        buffer = io.BytesIO()
+        with pq.ParquetWriter(buffer, schema) as writer:
+            for start in range(0, max(len(df_export), 1), chunk_rows):
+                chunk = df_export.iloc[start:start + chunk_rows]
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    else:
+        raise ValueError(f"Unknown export format: {file_format}")
+
+
+def export_file_name(scope, value, file_format):
+    """File name for a download, e.g. peer_district_payson_cusd_1.csv"""
+    extension = EXPORT_FORMATS[file_format][0]
+    if value is None:
+        label = scope
+    elif isinstance(value, tuple):
+        label = f"{scope}_" + "_".join(str(part) for part in value)
+    else:
+        label = f"{scope}_{value}"
+    label = "".join(c if c.isalnum() else "_" for c in label.lower()).strip("_")
+    return f"peer_{label}.{extension}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export PEER app data to CSV or Parquet.")
+    parser.add_argument("--scope", choices=["statewide", "district", "legislative", "legislator"], default="statewide")
+    parser.add_argument("--value", help='district name, "Chamber,District Number" or legislator name')
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="CSV")
+    parser.add_argument("--out", required=True, help="output file path")
+    args = parser.parse_args()
+
+    from validate_data import live_data_files
+
+    wide_file, coverage_file = live_data_files()
+    df = pd.read_parquet(wide_file)
+    df_leg = pd.read_csv(coverage_file)
+
+    value = args.value
+    if args.scope == "legislative":
+        chamber, district_number = value.split(",")
+        value = (chamber.strip(), int(district_number))
+
+    rows = export_frame(df, df_leg, args.scope, value)
+    with open(args.out, "wb") as f:
+        for chunk in iter_export_chunks(rows, args.format):
+            f.write(chunk)
+    print(f"Wrote {len(rows):,} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# PEER app import-time report
+# Measures what a fresh server process pays to import peer_app.py's dependencies.
+# The startup imports are read from peer_app.py's module-level import statements,
+# so the report follows the app as its imports change.
+# Usage: python import_report.py [--runs 5]
+
+import argparse
+import ast
+import importlib.util
+import os
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_FILE = os.path.join(APP_DIR, "peer_app.py")
+
+# Imported by pd.read_parquet when the app loads its data, before the first page
+
+DATA_LOAD_IMPORTS = ["pyarrow.parquet"]
+
+# Imports peer_app.py defers until first use. The lite page never loads them; the
+# first full page in a process does, since its charts run inside expanders.
+
+DEFERRED_IMPORTS = ["plotly.express", "plotly.graph_objects"]
+
+# Imports removed from startup (kept here so the savings stay visible). Ones no
+# longer installed are left out of the comparison.
+
+REMOVED_IMPORTS = ["PIL.Image", "streamlit_extras.stylable_container"]
+
+
+def startup_imports(path=APP_FILE):
+    """Modules imported by the module-level statements of an app script"""
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def installed(modules):
+    """The modules whose top-level package can be found"""
+    return [m for m in modules if importlib.util.find_spec(m.split(".")[0]) is not None]
+
+
+def import_time(modules):
+    """Import modules in a fresh interpreter and return the total import time in ms"""
+    code = "; ".join(f"import {m}" for m in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=APP_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    # -X importtime writes "import time: self | cumulative | name" lines to stderr.
+    # Top-level imports have no indentation, so summing them gives the total.
+
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        if cumulative_us.strip().isdigit() and not name[1:].startswith(" "):
+            total_us += int(cumulative_us)
+    return total_us / 1000
+
+
+def median_time(modules, runs):
+    """Median import time over several cold runs"""
+    return statistics.median(import_time(modules) for _ in range(runs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report cold import times for the PEER app.")
+    parser.add_argument("--runs", type=int, default=5, help="cold interpreter runs per measurement")
+    args = parser.parse_args()
+
+    startup_modules = startup_imports() + DATA_LOAD_IMPORTS
+    removed = installed(REMOVED_IMPORTS)
+    startup = median_time(startup_modules, args.runs)
+    with_deferred = median_time(startup_modules + DEFERRED_IMPORTS, args.runs)
+    previous = median_time(startup_modules + DEFERRED_IMPORTS + removed, args.runs)
+
+    print(f"Cold import times (median of {args.runs} runs)")
+    print(f"  startup imports ({', '.join(startup_modules)}): {startup:8.1f} ms")
+    print(f"  + deferred to the first full page ({', '.join(DEFERRED_IMPORTS)}): {with_deferred - startup:8.1f} ms")
+    print(f"  previous eager import set: {previous:8.1f} ms")
+    print(f"  cold start saving, lite page: {previous - startup:8.1f} ms")
+    print(f"  cold start saving, full page (dropped imports only): {previous - with_deferred:8.1f} ms")
+    skipped = sorted(set(REMOVED_IMPORTS) - set(removed))
+    if skipped:
+        print(f"  (not installed, left out of the previous set: {', '.join(skipped)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# PEER app lite mode
+# Plain HTML versions of the District Resource Needs and Legislative View content
+# for phones and slow connections: small tables and inline SVG bars, with no
+# Plotly, web fonts or remote images. peer_app.py renders these in lite mode;
+# run page_weight_report.py to compare what each mode sends.
+
+from html import escape
+
+from views import STAFFING_RESOURCES, staffing_sentence
+
+# PEER colors (see peer_hex_codes.txt)
+
+NEGATIVE_COLOR = "#C4384D"
+POSITIVE_COLOR = "#20a3bc"
+TEXT_COLOR = "#141554"
+BAR_WIDTH = 120
+BAR_HEIGHT = 12
+
+LITE_CSS = f"""<style>
+.lite-page {{color: {TEXT_COLOR}; font-family: sans-serif;}}
+.lite-page table {{border-collapse: collapse; width: 100%; margin-bottom: 1rem;}}
+.lite-page th, .lite-page td {{padding: 4px 6px; border-bottom: 1px solid #e0e7ff; text-align: left;}}
+.lite-page td.num {{text-align: right; white-space: nowrap;}}
+.lite-negative {{color: {NEGATIVE_COLOR}; font-weight: 700;}}
+.lite-positive {{color: {POSITIVE_COLOR}; font-weight: 700;}}
+</style>"""
+
+
+def svg_bar(value, max_value, color=POSITIVE_COLOR):
+    """Inline SVG bar, BAR_WIDTH pixels wide at max_value"""
+    width = 0 if not max_value or value != value else max(0, min(value / max_value, 1)) * BAR_WIDTH
+    return (f'<svg width="{BAR_WIDTH}" height="{BAR_HEIGHT}" role="img">'
+            f'<rect width="{width:.1f}" height="{BAR_HEIGHT}" fill="{color}"/></svg>')
+
+
+def bar_table(labels, values, value_format="{:.0%}"):
+    """Table of label, SVG bar and formatted value rows"""
+    values = list(values)
+    max_value = max((value for value in values if value == value), default=0)
+    rows = "".join(
+        f'<tr><td>{escape(str(label))}</td><td>{svg_bar(value, max_value)}</td>'
+        f'<td class="num">{format_value(value, value_format)}</td></tr>'
+        for label, value in zip(labels, values)
+    )
+    return f"<table>{rows}</table>"
+
+
+def format_value(value, value_format):
+    return "-" if value is None or value != value else value_format.format(value)
+
+
+def html_table(df, formats=None):
+    """A DataFrame as a plain HTML table; formats maps column names to format strings"""
+    formats = formats or {}
+    header = "".join(f"<th>{escape(str(column))}</th>" for column in df.columns)
+    rows = []
+    for row in df.itertuples(index=False):
+        cells = []
+        for column, value in zip(df.columns, row):
+            if column in formats:
+                cells.append(f'<td class="num">{format_value(value, formats[column])}</td>')
+            else:
+                cells.append(f"<td>{escape(str(value))}</td>")
+        rows.append(f"<tr>{''.join(cells)}</tr>")
+    return f"<table><tr>{header}</tr>{''.join(rows)}</table>"
+
+
+def adequacy_sentence(district_name, adequacy_level):
+    """The adequacy level headline"""
+    css_class = "lite-positive" if adequacy_level > 1 and district_name != "State of Illinois" else "lite-negative"
+    if district_name == "State of Illinois":
+        subject, verb = "Illinois school districts", "have"
+    else:
+        subject, verb = escape(district_name), "has"
+    return (f'<p><span class="{css_class}">{subject}</span> {verb} <span class="{css_class}">{adequacy_level * 100:.0f}%</span> '
+            f"of the state and local funding needed to be adequately funded.</p>")
+
+
+def dollar_table(payload):
+    """Needs, resources and gap (or surplus), in total and per pupil"""
+    gap_label = "School Funding Gap" if payload["gap"] < 0 else "School Funding Surplus"
+    gap_class = "num lite-positive" if payload["gap"] > 0 else "num lite-negative"
+    rows = [
+        ("School Funding Needs", payload["adequate"], payload["adequate_per_pupil"], "num"),
+        ("School Funding Resources", payload["actual"], payload["actual_per_pupil"], "num"),
+        (gap_label, payload["gap"], payload["gap_per_pupil"], gap_class),
+    ]
+    body = "".join(
+        f'<tr><td>{label}</td><td class="{css_class}">${total:,.0f}</td><td class="{css_class}">${per_pupil:,.0f}</td></tr>'
+        for label, total, per_pupil, css_class in rows
+    )
+    return f'<table><tr><th></th><th>Total</th><th>Per Pupil</th></tr>{body}</table>'
+
+
+def district_page(payload, legislators=(), is_rollup=False):
+    """HTML for the lite District Resource Needs tab"""
+    district_name = payload["district"]
+    parts = [LITE_CSS, '<div class="lite-page">', adequacy_sentence(district_name, payload["adequacy_level"])]
+    parts.append("<h4>💰 The Dollars and Cents of Adequate Funding</h4>")
+    parts.append(dollar_table(payload))
+
+    # Every resource type at once, so reading them doesn't need a round trip
+
+    parts.append("<h4>👩‍🏫 Adequate Staffing</h4><ul>")
+    parts.extend(f"<li>{escape(staffing_sentence(payload, resource, is_rollup))}</li>" for resource in STAFFING_RESOURCES)
+    parts.append("</ul>")
+
+    if legislators:
+        parts.append("<h4>🏛️ Your Legislators</h4>")
+        parts.append("<table><tr><th>Chamber</th><th>District</th><th>Legislator</th><th>Share of Students</th></tr>")
+        parts.extend(
+            f'<tr><td>{chamber}</td><td>{district_number}</td><td>{escape(str(legislator))}</td><td class="num">{share:.0%}</td></tr>'
+            for chamber, district_number, legislator, share in legislators
+        )
+        parts.append("</table>")
+
+    df_revenue = payload["df_revenue"]
+    parts.append("<h4>💰 Revenue by Source</h4>")
+    parts.append(bar_table(df_revenue["Revenue Source"], df_revenue["Revenue Percentages"]))
+    df_demographics = payload["df_demographics"]
+    parts.append("<h4>🧑‍🎓 Demographics</h4>")
+    parts.append(bar_table(df_demographics["Demographic Group"], df_demographics["Demographic Percentages"]))
+    parts.append("</div>")
+    return "".join(parts)
+
+
+# Column formats of the Legislative View tables (same as the full page)
+
+LEGISLATIVE_TABLES = [
+    ("School Districts Covered and Share of Students", "df_schools", {"Total Students": "{:,.0f}", "Share of Students": "{:.0%}"}),
+    ("Adequacy Funding Gaps and Levels", "df_adequacy_stats", {
+        "Adequacy Funding Gap": "${:,.0f}", "Adequacy Funding Gap Per Student": "${:,.0f}", "Adequacy Level": "{:.0%}"}),
+    ("Adequacy Funding Gaps by Position", "df_adequacy_pos", dict.fromkeys(STAFFING_RESOURCES, "{:,.0f}")),
+    ("Demographics", "df_demo", None),
+    ("Revenue Sources", "df_rev", None),
+]
+
+
+def legislative_page(leg_view):
+    """HTML for the lite Legislative View tab"""
+    parts = [LITE_CSS, '<div class="lite-page">', f"<h4>{escape(leg_view['title'])}</h4>"]
+    for title, key, formats in LEGISLATIVE_TABLES:
+        df_table = leg_view[key]
+        if formats is None:
+            formats = dict.fromkeys(df_table.columns[1:], "{:.1%}")
+        parts.append(f"<h4>{title}</h4>")
+        parts.append(html_table(df_table, formats))
+    parts.append("</div>")
+    return "".join(parts)
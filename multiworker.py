@@ -0,0 +1,341 @@
+# PEER app multi-worker deployment
+# Runs several Streamlit worker processes on one host behind a local sticky-session
+# proxy. All workers attach to one read-only, memory-mapped copy of the app data
+# (the "data plane") instead of each loading the parquet and CSV files. While serving,
+# the source files are watched, and a refresh (validate_data.py --publish) rebuilds
+# the data plane. Each build is a new version directory made live by renaming one
+# pointer file, like a published release, so a worker always maps both tables from
+# the same build, and picks up a new one on its next rerun. Streamlit only runs the
+# app script for a session, so at startup and after each rebuild a headless
+# ?warmup=1 session is opened on every worker; it starts the worker's cache
+# prewarm (see prewarm.py) before the first visitor arrives.
+#
+# The proxy routes by client IP address, so everyone behind one NAT or corporate
+# proxy (a school's network, say) shares one worker. Put a load balancer with
+# cookie-based stickiness in front of the worker ports when that matters.
+#
+# Usage: python multiworker.py prepare                 # write the data plane
+#        python multiworker.py serve --workers 4       # data plane + workers + proxy on :8501
+#        python multiworker.py bench --max-workers 4   # rerun throughput for 1..4 workers
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+import zlib
+
+import pandas as pd
+
+from validate_data import activate_release, current_release, live_data_files, new_release
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The data plane lives in shared memory when the host has it, so worker processes
+# map the same physical pages.
+
+DEFAULT_DATA_PLANE = "/dev/shm/peer_data_plane" if os.path.isdir("/dev/shm") else os.path.join(APP_DIR, "data_plane")
+DATA_PLANE_FILES = {"df": "app_data_wide.arrow", "df_leg": "leg_dist_coverage.arrow"}
+
+# Builds kept (a worker still on an older one keeps its mapping after it is deleted)
+
+KEEP_VERSIONS = 2
+
+INDEX_COLUMN = "__index_level_0__"
+
+# Seconds between checks of the source files while serving, and allowed for a
+# worker to start and run a warmup session
+
+WATCH_SECONDS = 5
+WARMUP_TIMEOUT = 120
+
+
+def frame_to_table(frame):
+    """Convert a DataFrame to an Arrow table, keeping NaN as float values.
+
+    Float columns without Arrow nulls convert back to pandas without a copy, so
+    the workers' numeric columns point straight at the memory-mapped file. The
+    index is stored as an INDEX_COLUMN column (the wide table's parquet file
+    keeps its own index, which isn't a RangeIndex) and restored by read_data_plane.
+    """
+    import pyarrow as pa
+
+    arrays = [pa.array(frame.index)]
+    for column in frame.columns:
+        values = frame[column]
+        if pd.api.types.is_float_dtype(values):
+            arrays.append(pa.array(values.to_numpy(), from_pandas=False))
+        else:
+            arrays.append(pa.array(values))
+    metadata = {"index_name": json.dumps(frame.index.name)}
+    return pa.Table.from_arrays(arrays, names=[INDEX_COLUMN] + list(frame.columns), metadata=metadata)
+
+
+def prepare_data_plane(path=DEFAULT_DATA_PLANE):
+    """Write the app data as uncompressed Arrow IPC files in a new version under path,
+    then make it the live version"""
+    import pyarrow as pa
+
+    wide_file, coverage_file = live_data_files()
+    frames = {
+        "df": pd.read_parquet(wide_file),
+        "df_leg": pd.read_csv(coverage_file),
+    }
+    version = new_release(path)
+    for name, frame in frames.items():
+        table = frame_to_table(frame)
+        with pa.OSFile(os.path.join(version, DATA_PLANE_FILES[name]), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    activate_release(path, version, keep=KEEP_VERSIONS)
+    return path
+
+
+def data_plane_files(path=DEFAULT_DATA_PLANE):
+    """Paths of the live version's files, {"df": ..., "df_leg": ...}. The pointer is
+    read once, so both are from the same build."""
+    version = current_release(path)
+    if version is None:
+        raise FileNotFoundError(f"No data plane in {path} (run: python multiworker.py prepare)")
+    return {name: os.path.join(version, file_name) for name, file_name in DATA_PLANE_FILES.items()}
+
+
+def read_data_plane(files):
+    """Attach to data plane files (from data_plane_files) and return (df, df_leg)
+    backed by the mapped files"""
+    import pyarrow as pa
+
+    frames = []
+    for name in ("df", "df_leg"):
+        source = pa.memory_map(files[name], "r")
+        table = pa.ipc.open_file(source).read_all()
+        index_name = json.loads(table.schema.metadata[b"index_name"])
+        frame = table.to_pandas(split_blocks=True)
+        frames.append(frame.set_index(INDEX_COLUMN).rename_axis(index_name))
+    return frames[0], frames[1]
+
+
+# Workers
+
+def start_workers(workers, first_port, data_plane):
+    """Start headless Streamlit workers on consecutive ports"""
+    env = dict(os.environ, PEER_DATA_PLANE=data_plane)
+    processes = []
+    for i in range(workers):
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", "peer_app.py",
+             "--server.port", str(first_port + i),
+             "--server.address", "127.0.0.1",
+             "--server.headless", "true"],
+            cwd=APP_DIR,
+            env=env,
+        ))
+    return processes
+
+
+# Sticky-session proxy. A Streamlit session lives on one websocket, and every
+# connection from the same client address goes to the same worker, so reconnects
+# and static requests land where the session state is.
+
+async def pipe(reader, writer):
+    try:
+        while data := await reader.read(65536):
+            writer.write(data)
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def proxy(listen_host, listen_port, worker_ports):
+    async def handle(client_reader, client_writer):
+        client_host = client_writer.get_extra_info("peername")[0]
+        start = zlib.crc32(client_host.encode()) % len(worker_ports)
+
+        # Fall through to the next worker if the sticky one is down
+
+        for offset in range(len(worker_ports)):
+            port = worker_ports[(start + offset) % len(worker_ports)]
+            try:
+                worker_reader, worker_writer = await asyncio.open_connection("127.0.0.1", port)
+                break
+            except OSError:
+                continue
+        else:
+            client_writer.close()
+            return
+        await asyncio.gather(pipe(client_reader, worker_writer), pipe(worker_reader, client_writer))
+
+    server = await asyncio.start_server(handle, listen_host, listen_port)
+    async with server:
+        await server.serve_forever()
+
+
+# Data refreshes. The data plane is rebuilt when a source file changes; each file
+# is swapped in with a rename, so workers still reading the old one keep their
+# mapping and the next rerun maps the new one.
+
+def source_version():
+    """Path, modification time and size of the live source files (a publish changes the paths)"""
+    return [(path, stat.st_mtime_ns, stat.st_size) for path in live_data_files() for stat in [os.stat(path)]]
+
+
+async def open_warmup_session(port):
+    """Run the app script once on a worker, as a session asking for ?warmup=1"""
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+    from websockets.asyncio.client import connect
+
+    request = BackMsg()
+    request.rerun_script.query_string = "warmup=1"
+    async with connect(f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"], max_size=None) as websocket:
+        await websocket.send(request.SerializeToString())
+        async for data in websocket:
+            message = ForwardMsg()
+            message.ParseFromString(data)
+            if message.WhichOneof("type") == "script_finished":
+                return
+
+
+async def warm_workers(worker_ports):
+    """Open a warmup session on every worker, retrying while workers start"""
+    async def warm(port):
+        deadline = time.monotonic() + WARMUP_TIMEOUT
+        while True:
+            try:
+                return await asyncio.wait_for(open_warmup_session(port), WARMUP_TIMEOUT)
+            except Exception as e:
+                if time.monotonic() > deadline:
+                    print(f"Worker on port {port} not warmed: {e!r}", file=sys.stderr)
+                    return
+                await asyncio.sleep(1)
+
+    await asyncio.gather(*(warm(port) for port in worker_ports))
+
+
+async def watch_sources(data_plane, version, worker_ports):
+    while True:
+        await asyncio.sleep(WATCH_SECONDS)
+        try:
+            current = source_version()
+            if current == version:
+                continue
+            await asyncio.to_thread(prepare_data_plane, data_plane)
+        except Exception as e:
+            print(f"Data plane not rebuilt: {e}", file=sys.stderr)
+            continue
+        version = current
+        print(f"Data plane rebuilt at {time.strftime('%H:%M:%S')}")
+        await warm_workers(worker_ports)
+
+
+async def serve_forever(args, data_plane, version, worker_ports):
+    await asyncio.gather(proxy(args.host, args.port, worker_ports), watch_sources(data_plane, version, worker_ports),
+                         warm_workers(worker_ports))
+
+
+def serve(args):
+    version = source_version()
+    data_plane = prepare_data_plane(args.data_plane)
+    worker_ports = [args.first_worker_port + i for i in range(args.workers)]
+    processes = start_workers(args.workers, args.first_worker_port, data_plane)
+    print(f"{args.workers} workers on ports {worker_ports[0]}-{worker_ports[-1]}, data plane {data_plane}")
+    print(f"Proxy listening on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(serve_forever(args, data_plane, version, worker_ports))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+# Throughput harness. Each benchmark process runs the app script with Streamlit's
+# AppTest, switching districts on every rerun, so the measured work is the same
+# pandas and chart code a real session runs.
+
+BENCH_DISTRICTS = 20
+
+
+def bench_worker(data_plane, duration, start_at, results):
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    os.environ["PEER_DATA_PLANE"] = data_plane
+    os.chdir(APP_DIR)
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(APP_DIR, "peer_app.py"), default_timeout=120).run()
+    districts = list(at.selectbox[0].options)[:BENCH_DISTRICTS]
+
+    # Warm the caches, then wait so all processes measure the same window
+
+    for district in districts:
+        at.selectbox[0].select(district).run()
+    time.sleep(max(0, start_at - time.time()))
+
+    reruns = 0
+    deadline = time.time() + duration
+    while time.time() < deadline:
+        at.selectbox[0].select(districts[reruns % len(districts)]).run()
+        reruns += 1
+    results.put(reruns)
+
+
+def bench(args):
+    data_plane = prepare_data_plane(args.data_plane)
+    context = multiprocessing.get_context("spawn")
+    print(f"Rerun throughput over {args.duration:.0f}s ({os.cpu_count()} CPUs)")
+    baseline = None
+    for workers in range(1, args.max_workers + 1):
+        results = context.Queue()
+        start_at = time.time() + args.warmup
+        processes = [
+            context.Process(target=bench_worker, args=(data_plane, args.duration, start_at, results))
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        reruns = sum(results.get() for _ in processes)
+        for process in processes:
+            process.join()
+        throughput = reruns / args.duration
+        baseline = baseline or throughput
+        print(f"  {workers} worker(s): {throughput:7.1f} reruns/s  "
+              f"speedup {throughput / baseline:4.2f}x  efficiency {throughput / baseline / workers:4.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the PEER app as several workers sharing one data plane.")
+    parser.add_argument("--data-plane", default=DEFAULT_DATA_PLANE, help="directory for the shared Arrow files")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("prepare", help="write the data plane and exit")
+
+    serve_parser = commands.add_parser("serve", help="start workers behind a sticky-session proxy")
+    serve_parser.add_argument("--workers", type=int, default=os.cpu_count())
+    serve_parser.add_argument("--host", default="0.0.0.0")
+    serve_parser.add_argument("--port", type=int, default=8501)
+    serve_parser.add_argument("--first-worker-port", type=int, default=8601)
+
+    bench_parser = commands.add_parser("bench", help="measure rerun throughput as workers are added")
+    bench_parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    bench_parser.add_argument("--duration", type=float, default=10.0, help="seconds measured per step")
+    bench_parser.add_argument("--warmup", type=float, default=30.0, help="seconds allowed for startup and cache warming")
+
+    args = parser.parse_args()
+    if args.command == "prepare":
+        print(f"Data plane written to {prepare_data_plane(args.data_plane)}")
+    elif args.command == "serve":
+        serve(args)
+    else:
+        bench(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# PEER app page weight report
+# Compares what the full and lite pages send to a browser: the element payload
+# the server streams, the lazily loaded frontend bundles those elements need
+# (Plotly, the data grid) and remote assets (photos, web fonts) the page links to,
+# along with the server time per page. Times to first content (the adequacy
+# headline) and to a fully loaded page are estimated for a given connection speed.
+# Usage: python page_weight_report.py [--runs 3] [--kbps 400]
+
+import argparse
+import gzip
+import glob
+import logging
+import os
+import re
+import statistics
+import time
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MODES = {"full": "0", "lite": "1"}
+SAMPLE_DISTRICTS = ["State of Illinois", "Chicago Public Schools District 299", "Payson CUSD 1"]
+
+# Frontend bundles Streamlit loads on demand, by the element type that needs them
+
+LAZY_BUNDLES = {"plotly_chart": "PlotlyChart", "arrow_data_frame": "DataFrame"}
+
+# The first content a visitor needs is the adequacy headline
+
+FIRST_CONTENT = "adequately funded"
+
+REMOTE_URL = re.compile(r"""(?:url\(['"]?|@import url\(['"]?)(https?://[^'")\s]+)""")
+
+
+def bundle_size(name):
+    """Gzipped size in bytes of one of Streamlit's frontend bundles"""
+    import streamlit
+
+    pattern = os.path.join(os.path.dirname(streamlit.__file__), "static", "static", "js", f"{name}.*.js")
+    paths = glob.glob(pattern)
+    if not paths:
+        return 0
+    with open(paths[0], "rb") as f:
+        return len(gzip.compress(f.read()))
+
+
+def walk(node):
+    """Yield every element and block of an AppTest tree"""
+    yield node
+    for child in getattr(node, "children", {}).values():
+        yield from walk(child)
+
+
+def page_weight(at):
+    """Payload bytes (in total and up to the first content), element types and remote URLs of an AppTest run"""
+    payload = 0
+    first_content = None
+    element_types = set()
+    remote_urls = set()
+    for node in walk(at._tree):
+        proto = getattr(node, "proto", None)
+        if proto is None:
+            continue
+        payload += proto.ByteSize()
+        element_types.add(getattr(node, "type", None))
+        body = getattr(proto, "body", "")
+        if isinstance(body, str):
+            remote_urls.update(REMOTE_URL.findall(body))
+            if first_content is None and FIRST_CONTENT in body:
+                first_content = payload
+    return payload, first_content or payload, element_types, remote_urls
+
+
+def measure(mode, district, runs):
+    """Median server time and the page weight of one page view"""
+    from streamlit.testing.v1 import AppTest
+
+    times = []
+    for _ in range(runs):
+        at = AppTest.from_file(os.path.join(APP_DIR, "peer_app.py"), default_timeout=120)
+        at.query_params["lite"] = MODES[mode]
+        at.query_params["district"] = district
+        start = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - start)
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return statistics.median(times), *page_weight(at)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare page weight of the PEER app's full and lite modes.")
+    parser.add_argument("--runs", type=int, default=3, help="runs per page (the first also warms the caches)")
+    parser.add_argument("--kbps", type=float, default=400, help="connection speed used for the time estimate")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    os.chdir(APP_DIR)
+    bytes_per_second = args.kbps * 1000 / 8
+
+    print(f"Page weight by mode (median of {args.runs} runs, estimate at {args.kbps:,.0f} kbps)")
+    for district in SAMPLE_DISTRICTS:
+        print(f"  {district}")
+        for mode in MODES:
+            server_time, payload, first_payload, element_types, remote_urls = measure(mode, district, args.runs)
+            bundles = sum(bundle_size(name) for element_type, name in LAZY_BUNDLES.items() if element_type in element_types)
+
+            # Remote asset sizes aren't fetched, so they only add to the request count.
+            # The server time is the whole script run (an upper bound for first content).
+
+            first_content = server_time + first_payload / bytes_per_second
+            loaded = server_time + (payload + bundles) / bytes_per_second
+            print(f"    {mode:4}: payload {payload / 1024:6.1f} KB  bundles {bundles / 1024:7.1f} KB (gzip)  "
+                  f"remote assets {len(remote_urls)}  server {server_time * 1000:5.0f} ms  "
+                  f"est. first content {first_content:5.1f} s  loaded {loaded:5.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,47 @@
 # PEER School district resource inequality app
 # Authors: Chris D. Poulos (cdpoulos@gmail.com), Erykah Nava (EMAIL)
 
+import importlib
+import json
+import logging
+import os
+import tempfile
 import streamlit as st
-from PIL import Image
 import pandas as pd
-import plotly.express as px
 import numpy as np
-from streamlit_extras.stylable_container import stylable_container
-
+from concurrent.futures import ThreadPoolExecutor
+from export_data import EXPORT_FORMATS, export_file_name, export_frame, iter_export_chunks
+from rollups import build_rollups
+from build_geometries import ZOOM_LEVELS, geometry_path, load_geojson
+from build_school_partitions import school_partition_path
+from prewarm import ACCESS_STATS_FILE, AccessStats, outside_background_threads, prewarm_in_background, view_key
+from validate_data import live_data_files
+from views import (DISTRIBUTION_METRICS, STAFFING_RESOURCES, distribution_summary,
+                   district_view, legislative_view, percentile_rank, school_view, staffing_sentence)
+
+# plotly.express is imported where the charts are drawn (and in the background once
+# the full page starts drawing) so its dependency graph never loads for the lite
+# page. The full page still pays for it on its first run in a process: the charts
+# sit in expanders, and Streamlit runs an expander's body even while it is
+# collapsed. Run import_report.py to see startup costs.
+
+
+# Styled containers. Same markup as streamlit_extras.stylable_container, which is
+# deprecated and slow to import, so the app no longer depends on it.
+
+def stylable_container(key, css_styles):
+    """Return an st.container whose contents are styled with css_styles"""
+    class_name = f"st-key-{key.strip()}"
+    if isinstance(css_styles, str):
+        css_styles = [css_styles]
+    css_styles = css_styles + ["> div:first-child {margin-bottom: -1rem;}"]
+    style_text = "<style>"
+    for style in css_styles:
+        style_text += f"\n.st-key-{class_name} {style}\n"
+    style_text += "</style>"
+    container = st.container(key=class_name)
+    container.html(style_text)
+    return container
 
 # Page config
 
@@ -15,12 +49,36 @@ st.set_page_config(page_title='🏫 IL school resource ≠ app', layout='centere
 
 # Read in and cahce data set
 
+# The live tables: the last published release, or the ones in the app directory
+# (see validate_data.py)
+
+DATA_FILES = list(live_data_files())
+
+# When run by multiworker.py, workers read a shared memory-mapped copy of the data
+# (the data plane) instead of the parquet and CSV files.
+
+DATA_PLANE = os.environ.get("PEER_DATA_PLANE")
+if DATA_PLANE:
+    from multiworker import data_plane_files, read_data_plane
+    data_plane = data_plane_files(DATA_PLANE)
+    DATA_FILES = [data_plane["df"], data_plane["df_leg"]]
+
+def get_data_version():
+    """Identify the current data files by modification time and size (used as a cache key)"""
+    try:
+        stats = [os.stat(path) for path in DATA_FILES]
+    except FileNotFoundError:
+        return "missing"
+    return "-".join(f"{stat.st_mtime_ns:x}{stat.st_size:x}" for stat in stats)
+
+data_version = get_data_version()
+
 @st.cache_data
-def load_data():
+def load_data(data_version):
     """Load the PEER app parquet file and legislative district coverage CSV"""
     try:
-        df = pd.read_parquet(r"app_data_wide.parquet")
-        df_leg = pd.read_csv(r"leg_dist_coverage.csv")
+        df = pd.read_parquet(DATA_FILES[0])
+        df_leg = pd.read_csv(DATA_FILES[1])
         return df, df_leg
     except FileNotFoundError:
         st.error("Data file not found. Please ensure the parquet file is in the correct location.")
@@ -29,195 +87,525 @@ def load_data():
         st.error(f"Error loading data: {e}")
         return None, None
 
-df,df_leg = load_data()
+@st.cache_resource(max_entries=1)
+def load_shared_data(data_version):
+    """Attach to the data plane. cache_resource hands every session the same mapped frames,
+    and drops the previous data plane's frames once a refresh is loaded."""
+    return read_data_plane(data_plane)
+
+if DATA_PLANE:
+    df,df_leg = load_shared_data(data_version)
+else:
+    df,df_leg = load_data(data_version)
+
+# Region and county rollups (see rollups.py). They have the same columns as the
+# wide table, so they can be selected and shown like a district.
+
+@st.cache_data
+def load_rollups(data_version):
+    """Aggregate districts to regions and counties once per data version"""
+    return build_rollups(df)
+
+df_rollups = load_rollups(data_version) if df is not None else None
 
 @st.cache_data
 def process_filtered_data(district_name):
     """Cache filtered data processing"""
     df_filtered = df[df['District Name (IRC)'] == district_name]
+    if df_filtered.empty:
+        df_filtered = df_rollups[df_rollups['District Name (IRC)'] == district_name]
     return df_filtered
 
-# Melt data into long format for charts and drop down menus.
+# Similar districts. Features are z-scored (enrollment on a log scale) and every
+# district's nearest neighbors are precomputed in one matrix pass, so a lookup is
+# a dictionary access. st.cache_resource keeps one shared index per data version.
+
+SIMILARITY_FEATURES = [
+    "White (%)", "Black (%)", "Latine (%)", "Asian (%)",
+    "Native Hawaiian or Other Pacific Islander (%)",
+    "American Indian or Alaska Native (%)", "IEP (%)", "EL (%)", "Low Income (%)",
+    "Local Property Taxes (%)", "Other Local Funding (%)",
+    "Evidence-Based Funding (%)", "Other State Funding (%)", "Federal Funding (%)",
+    "Total ASE", "Adequacy Level"
+]
+SIMILARITY_MAX_K = 10
+
+@st.cache_resource
+def build_similarity_index(_df, data_version):
+    """Map each district name to its SIMILARITY_MAX_K nearest districts and distances"""
+    districts = _df[_df['District Name (IRC)'] != "State of Illinois"]
+    names = districts['District Name (IRC)'].to_numpy()
+    features = districts[SIMILARITY_FEATURES].fillna(0).to_numpy(dtype=float, copy=True)
+    ase_col = SIMILARITY_FEATURES.index("Total ASE")
+    features[:, ase_col] = np.log1p(features[:, ase_col])
+    std = features.std(axis=0)
+    std[std == 0] = 1
+    z = (features - features.mean(axis=0)) / std
+
+    # Squared euclidean distances for all pairs, excluding each district itself
+
+    sq_norms = (z ** 2).sum(axis=1)
+    dist = np.maximum(sq_norms[:, None] + sq_norms[None, :] - 2 * z @ z.T, 0)
+    np.fill_diagonal(dist, np.inf)
+    k = min(SIMILARITY_MAX_K, len(names) - 1)
+    nearest = np.argpartition(dist, k, axis=1)[:, :k]
+    nearest_dist = np.take_along_axis(dist, nearest, axis=1)
+    order = np.argsort(nearest_dist, axis=1)
+    nearest = np.take_along_axis(nearest, order, axis=1)
+    nearest_dist = np.sqrt(np.take_along_axis(nearest_dist, order, axis=1))
+    return {name: (names[nearest[i]], nearest_dist[i]) for i, name in enumerate(names)}
+
+def find_similar_districts(district_name, k=5):
+    """Return the k most similar district names and their distances"""
+    index = build_similarity_index(df, data_version)
+    if district_name not in index:
+        return [], []
+    names, distances = index[district_name]
+    return names[:k], distances[:k]
+
+# Legislators by district. Inverse of the coverage table tab2 uses: RCDTS -> every
+# (Chamber, District Number, Legislator Name, Share of Students) covering it.
+# Built once per data version so tab1 never filters df_leg on a rerun.
+
+@st.cache_resource
+def build_legislator_index(_df_leg, data_version):
+    """Map each RCDTS to the legislative districts that cover it (Senate first)"""
+    coverage = _df_leg.sort_values(['RCDTS', 'Chamber', 'District Number'], ascending=[True, False, True])
+    rows = zip(coverage['Chamber'], coverage['District Number'], coverage['Legislator Name'], coverage['Share of Students'])
+    index = {}
+    for rcdts, row in zip(coverage['RCDTS'], rows):
+        index.setdefault(rcdts, []).append(row)
+    return index
+
+def find_legislators(rcdts):
+    """Return [(Chamber, District Number, Legislator Name, Share of Students), ...] for a district"""
+    return build_legislator_index(df_leg, data_version).get(rcdts, [])
+
+# District comparison. Every selected district is computed in one vectorized pass
+# over a name-indexed copy of the wide table (districts and rollups).
+
+COMPARISON_MAX_DISTRICTS = 12
+COMPARISON_POSITIONS = [
+    "Core and Specialist Teachers Gap (EIS)", "Special Education Teachers Gap (EIS)",
+    "Counselors Gap (IRC)", "Nurses Gap (IRC)", "Psychologists Gap (IRC)",
+    "Principals Gap (EIS)", "Assistant Principals Gap (EIS)", "EL Teachers Gap (EIS)"
+]
+COMPARISON_REVENUE = [
+    "Local Property Taxes (%)", "Other Local Funding (%)", "Evidence-Based Funding (%)",
+    "Other State Funding (%)", "Federal Funding (%)"
+]
+COMPARISON_DEMOGRAPHICS = [
+    "White (%)", "Black (%)", "Latine (%)", "Asian (%)",
+    "Native Hawaiian or Other Pacific Islander (%)", "American Indian or Alaska Native (%)",
+    "IEP (%)", "EL (%)", "Low Income (%)"
+]
+
+@st.cache_resource
+def build_district_lookup(_df, _df_rollups, data_version):
+    """Districts and rollups indexed by name"""
+    return pd.concat([_df, _df_rollups]).set_index('District Name (IRC)')
 
-@st.cache_data  
-def calculate_funding_metrics(df_filtered):
-    
-    # EBF adequacy
-    
-    df_adequacy = pd.melt(
-        df_filtered,
-        id_vars=["RCDTS","District Name (IRC)","Total ASE"],
-        value_vars=[
-            "Adequacy Target",
-            "Adequacy Target Per Student",
-            "Adequate Core and Specialist Teachers",
-            "Adequate Special Education Teachers",
-            "Adequate Counselors",
-            "Adequate Nurses",
-            "Adequate Psychologists",
-            "Adequate Principals",
-            "Adequate Assistant Principals",
-            "Adequate EL Teachers"
-            ],
-            var_name="Resource",
-            value_name="Adequate resources"
-            )
-    df_adequacy["Resource"] = df_adequacy["Resource"].str.replace("Adequate ", "", regex=False)
-    df_adequacy["Resource"] = df_adequacy["Resource"].str.replace("Adequacy Target", "Total Resources (Dollar Amount)", regex=False)
-    df_adequacy["Resource"] = df_adequacy["Resource"].str.replace("Adequate Target Per Student", "Total Resources Per Student (Dollar Amount)", regex=False)
-    
-    # Actual resources 
-
-    df_actual = pd.melt(
-        df_filtered,
-        id_vars=["RCDTS", "Total ASE"],
-        value_vars=[
-            "Actual Resources",
-            "Actual Core and Specialist Teachers Count (EIS)",
-            "Actual Special Education Teachers Count (EIS)",
-            "Actual Counselors Count (IRC)",
-            "Actual Nurses Count (IRC)",
-            "Actual Psychologists Count (IRC)",
-            "Actual Principals Count (EIS)",
-            "Actual Assistant Principals Count (EIS)",
-            "Actual EL Teachers (EIS)"
-        ],
-        var_name="Resource",
-        value_name="Actual"
-        )
-    df_actual["Resource"] = df_actual["Resource"].str.replace("Actual ", "", regex=False)
-    df_actual["Resource"] = df_actual["Resource"].str.replace(" Count (EIS)", "", regex=False)
-    df_actual["Resource"] = df_actual["Resource"].str.replace(" (EIS)", "", regex=False)
-    df_actual["Resource"] = df_actual["Resource"].str.replace(" Count (IRC)", "", regex=False)
-    df_actual["Resource"] = df_actual["Resource"].str.replace("Resources", "Total Resources (Dollar Amount)", regex=False)
-    df_actual["Resource"] = df_actual["Resource"].str.replace("Resources Per Student", "Total Resources Per Student (Dollar Amount)", regex=False)
-    
-    # Adequacy gaps
-
-    df_gaps = pd.melt(
-        df_filtered,
-        id_vars=["RCDTS", "Total ASE"],
-        value_vars=[
-             "Adequacy Funding Gap",
-            "Adequacy Funding Gap Per Student",
-            "Core and Specialist Teachers Gap (EIS)",
-            "Special Education Teachers Gap (EIS)",
-            "Counselors Gap (IRC)",
-            "Nurses Gap (IRC)",
-            "Psychologists Gap (IRC)",
-            "Principals Gap (EIS)",
-            "Assistant Principals Gap (EIS)",
-            "EL Teachers Gap (EIS)"
-        ],
-        var_name="Resource",
-        value_name="Gaps"
-        )
-    df_gaps["Resource"] = df_gaps["Resource"].str.replace("Adequacy Funding Gap", "Total Resources (Dollar Amount)", regex=False)
-    df_gaps["Resource"] = df_gaps["Resource"].str.replace("Adequacy Funding Gap Per Student", "Total Resources Per Student (Dollar Amount)", regex=False)
-    df_gaps["Resource"] = df_gaps["Resource"].str.replace(" Gap (EIS)", "", regex=False)
-    df_gaps["Resource"] = df_gaps["Resource"].str.replace(" Gap (IRC)", "", regex=False)
-
-    illinois_negative_gap_sum = df_gaps["Gaps"].min()   
-
-    # Adequacy gaps per school
-
-    df_gaps_perschool = pd.melt(
-        df_filtered,
-        id_vars=["RCDTS", "Total ASE"],
-        value_vars=[
-             "Adequacy Funding Gap Per School",
-            "Core and Specialist Teachers Gap Per School",
-            "Special Education Teachers Gap Per School",
-            "Counselors Gap Per School",
-            "Nurses Gap Per School",
-            "Psychologists Gap Per School",
-            "Principals Gap Per School",
-            "Assistant Principals Gap Per School",
-            "EL Teachers Gap Per School"
-        ],
-        var_name="Resource",
-        value_name="Gaps Per School"
-        )
-    df_gaps_perschool["Resource"] = df_gaps_perschool["Resource"].str.replace(" Gap Per School", "", regex=False)
-
-
-    illinois_negative_gap_sum_perschool = df_gaps["Gaps"].min()     
-
-    # Merge adequacy and actuals
-
-    df_merged = pd.merge(
-        df_adequacy,
-        df_actual,
-        on=["RCDTS", "Resource", "Total ASE"],
-        how="left"
-    )
-
-    # Merge gaps
-
-    df_merged = pd.merge(
-        df_merged,
-        df_gaps,
-        on=["RCDTS", "Resource", "Total ASE"],
-        how="left"
-    )
-
-    # Merge gaps per school
-
-    df_merged = pd.merge(
-        df_merged,
-        df_gaps_perschool,
-        on=["RCDTS", "Resource", "Total ASE"],
-        how="left"
-    )
-
-    # Demographics melt
-
-    df_demographics = pd.melt(
-    df_filtered,
-    id_vars=["RCDTS", "District Name (IRC)", "Total ASE"],
-    value_vars=[
-        "White (%)", "Black (%)", "Latine (%)", "Asian (%)",
-        "Native Hawaiian or Other Pacific Islander (%)",
-        "American Indian or Alaska Native (%)","IEP (%)", "EL (%)", "Low Income (%)"
-    ],
-    var_name="Demographic Group",
-    value_name="Demographic Percentages"
-    )
+@st.cache_data
+def compare_districts(district_names, data_version):
+    """Return comparison tables (funding, positions, revenue, demographics) with one column per district"""
+    rows = build_district_lookup(df, df_rollups, data_version).loc[list(district_names)].rename_axis(None)
+    ase = rows['Total ASE'].where(rows['Total ASE'] > 0)
+
+    gap = rows['Adequacy Funding Gap'].copy()
+    gap_per_pupil = gap / ase
+
+    # The statewide gaps are the ones the District Resource Needs tab shows (ISBE's
+    # statewide gap, and its own per pupil gap)
+
+    if "State of Illinois" in rows.index:
+        statewide = get_district_view("State of Illinois", data_version)
+        gap["State of Illinois"] = statewide["gap"]
+        gap_per_pupil["State of Illinois"] = statewide["gap_per_pupil"]
+    funding = pd.DataFrame({
+        "Adequacy Level": rows['Adequacy Level'],
+        "School Funding Needs": rows['Adequacy Target'],
+        "School Funding Resources": rows['Actual Resources'],
+        "School Funding Gap": gap,
+        "Needs Per Pupil": rows['Adequacy Target'] / ase,
+        "Resources Per Pupil": rows['Actual Resources'] / ase,
+        "Gap Per Pupil": gap_per_pupil,
+        "Students (ASE)": rows['Total ASE']
+    }).T
+    positions = rows[COMPARISON_POSITIONS].T
+    positions.index = positions.index.str.replace(r" Gap \((EIS|IRC)\)", "", regex=True)
+    revenue = rows[COMPARISON_REVENUE].T
+    revenue.index = revenue.index.str.replace(" (%)", "", regex=False)
+    demographics = rows[COMPARISON_DEMOGRAPHICS].T
+    demographics.index = demographics.index.str.replace(" (%)", "", regex=False)
+    return funding, positions, revenue, demographics
+
+# Map. Boundaries are simplified ahead of time by build_geometries.py. The decoded
+# GeoJSON is kept in st.cache_resource and shared by every session, and metric
+# values are joined to it by key (RCDTS or legislative district number).
+
+MAP_LAYER_LABELS = {"School Districts": "school_districts", "House Districts": "house", "Senate Districts": "senate"}
+
+# Metric -> (tick format, color midpoint, reversed scale). Funding gap per student
+# is positive when a district is short of adequacy (as in the wide table and the
+# distribution chart), so its scale is reversed: short is red for both metrics.
+
+MAP_METRICS = {"Adequacy Level": (".0%", 1, False), "Funding Gap Per Student": ("$,.0f", 0, True)}
+
+@st.cache_resource
+def load_map_geometry(layer, zoom, geometry_version):
+    """GeoJSON for a built map layer, or None if it hasn't been built"""
+    return load_geojson(layer, zoom)
+
+def get_map_geometry(layer, zoom):
+    path = geometry_path(layer, zoom)
+    geometry_version = os.path.getmtime(path) if os.path.exists(path) else None
+    return load_map_geometry(layer, zoom, geometry_version)
 
-    # Demographics column name formatting
+@st.cache_data
+def map_values(layer, data_version):
+    """Adequacy Level and funding gap per student for every feature of a map layer.
+
+    Legislative districts combine the school districts they cover, weighting
+    each by its share of students in the legislative district.
+    """
+    districts = df[df['District Name (IRC)'] != "State of Illinois"]
+    if layer == "school_districts":
+        return pd.DataFrame({
+            "key": districts['RCDTS'],
+            "Name": districts['District Name (IRC)'],
+            "Adequacy Level": districts['Adequacy Level'],
+            "Funding Gap Per Student": districts['Adequacy Funding Gap Per Student']
+        })
+    chamber = "House" if layer == "house" else "Senate"
+    coverage = df_leg[df_leg['Chamber'] == chamber].merge(
+        districts[['RCDTS', 'Total ASE', 'Adequacy Level', 'Adequacy Funding Gap']], on="RCDTS", how="inner")
+    students = coverage['Total ASE'] * coverage['Share of Students']
+    grouped = pd.DataFrame({
+        "District Number": coverage['District Number'],
+        "Name": coverage['Legislator Name'],
+        "students": students,
+        "level": coverage['Adequacy Level'] * students,
+        "gap": coverage['Adequacy Funding Gap'] * coverage['Share of Students']
+    }).groupby("District Number").agg(Name=("Name", "first"), students=("students", "sum"), level=("level", "sum"), gap=("gap", "sum"))
+    students = grouped['students'].where(grouped['students'] > 0)
+    return pd.DataFrame({
+        "key": grouped.index.astype(str),
+        "Name": grouped['Name'] + f" ({chamber} District " + grouped.index.astype(str) + ")",
+        "Adequacy Level": grouped['level'] / students,
+        "Funding Gap Per Student": -grouped['gap'] / students
+    }).reset_index(drop=True)
+
+# Schools (see build_school_partitions.py). Each district's schools are in their
+# own file, read only when that district is selected, so statewide school data is
+# never loaded. Only the most recently viewed districts stay cached.
+
+@st.cache_data(max_entries=32)
+def load_school_partition(district_rcdts, partition_version):
+    """One district's schools"""
+    return pd.read_parquet(school_partition_path(district_rcdts))
+
+def get_schools(district_rcdts):
+    """A district's schools, or None if its school file hasn't been built"""
+    path = school_partition_path(district_rcdts)
+    try:
+        return load_school_partition(district_rcdts, os.path.getmtime(path))
+    except FileNotFoundError:
+        # Not built, or caught between the two renames of a rebuild
+        return None
+
+# Distribution charts. Bin counts and quantiles of every metric are computed once
+# per data version and shared by all sessions. Changing the selection only moves
+# the highlighted district; the distribution itself is never recomputed.
+
+@st.cache_resource
+def build_distributions(_df, data_version):
+    """Histogram bins, quantiles and sorted values of each metric in DISTRIBUTION_METRICS"""
+    return distribution_summary(_df)
+
+# Data downloads. st.download_button needs the whole file as bytes (a callable
+# may return bytes or a file object, which Streamlit reads in full), so the chunks
+# from export_data.py are joined here and nothing is streamed to the browser. Peak
+# memory per export is the finished file; it's built once and shared across
+# sessions, keyed by data version and filter.
+
+@st.cache_resource(max_entries=64)
+def build_export(data_version, scope, value, file_format):
+    """Export file bytes for a scope ("statewide", "district", "rollup", "legislative", "legislator")"""
+    if scope == "rollup":
+        return b"".join(iter_export_chunks(export_frame(df_rollups, df_leg, "district", value), file_format))
+    return b"".join(iter_export_chunks(export_frame(df, df_leg, scope, value), file_format))
+
+def download_buttons(scope, value, label, key):
+    """Show CSV and Parquet download buttons; files are built when clicked"""
+    columns = st.columns(len(EXPORT_FORMATS))
+    for column, (file_format, (_, mime)) in zip(columns, EXPORT_FORMATS.items()):
+        with column:
+            st.download_button(
+                f"⬇️ {label} ({file_format})",
+                data=lambda file_format=file_format: build_export(data_version, scope, value, file_format),
+                file_name=export_file_name(scope, value, file_format),
+                mime=mime,
+                key=f"{key}_{file_format}",
+                on_click="ignore"
+            )
 
-    df_demographics["Demographic Group"] = df_demographics["Demographic Group"].str.replace(" (%)", "", regex=False)
+# View payloads (see views.py). Cached per data version and normalized view
+# parameters. persist="disk" lets every worker on the host reuse a payload, so a
+# widely shared link is computed once. max_entries only bounds the in-memory
+# copies (about one data version's worth of views), so the disk entries of older
+# versions are cleared by the first worker to load new data, which records the
+# version it cleared for next to the view counts.
+
+VIEW_CACHE_ENTRIES = 1024
+VIEW_CACHE_VERSION_FILE = os.path.join(os.path.dirname(ACCESS_STATS_FILE), "view_cache_version")
+
+@st.cache_data(persist="disk", max_entries=VIEW_CACHE_ENTRIES)
+def get_district_view(district_name, data_version):
+    """District Resource Needs values for a district, county, region or the state"""
+    return district_view(process_filtered_data(district_name), district_name)
+
+@st.cache_data(persist="disk", max_entries=VIEW_CACHE_ENTRIES)
+def get_legislative_view(chamber, district_number, legislator, data_version):
+    """Legislative View tables for a chamber and district number, or for a legislator"""
+    return legislative_view(df, df_leg, chamber, district_number, legislator)
+
+@st.cache_resource(max_entries=1)
+def clear_old_views(data_version):
+    """Clear the persisted views of other data versions, once per process and data version"""
+    try:
+        with open(VIEW_CACHE_VERSION_FILE) as f:
+            cleared_for = f.read()
+    except FileNotFoundError:
+        cleared_for = None
+    if cleared_for == data_version:
+        return
+    get_district_view.clear()
+    get_legislative_view.clear()
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(VIEW_CACHE_VERSION_FILE), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write(data_version)
+    os.replace(tmp_path, VIEW_CACHE_VERSION_FILE)
+
+clear_old_views(data_version)
+
+# Prewarming (see prewarm.py). Each session counts the views it opens, and on the
+# first script run of a server process, or the first after the data changes, the
+# most viewed ones from the last week are computed in a background thread pool.
+# Nothing waits for it. Streamlit only runs the script for a session, so under
+# plain `streamlit run` that is the first visitor's; multiworker.py opens a
+# ?warmup=1 session on each worker at startup and after a refresh, which starts
+# the prewarm and stops there.
+
+@st.cache_resource
+def get_access_stats():
+    return AccessStats()
+
+def record_view(*view):
+    """Count a view once per session"""
+    key = view_key(*view)
+    viewed = st.session_state.setdefault("viewed", set())
+    if key not in viewed:
+        viewed.add(key)
+        get_access_stats().record(key)
+
+def render_view(key, data_version):
+    kind, *params = json.loads(key)
+    if kind == "district":
+        get_district_view(params[0], data_version)
+    elif kind == "legislative":
+        get_legislative_view(params[0], params[1], None, data_version)
+    else:
+        get_legislative_view(None, None, params[0], data_version)
+
+logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(outside_background_threads)
+
+@st.cache_resource(max_entries=1)
+def start_prewarm(data_version):
+    """Start prewarming once per process and data version"""
+    chamber = sorted(df_leg['Chamber'].unique())[0]
+    default_views = [
+        view_key("district", "State of Illinois"),
+        view_key("legislative", chamber, int(df_leg.loc[df_leg['Chamber'] == chamber, 'District Number'].min())),
+    ]
+    return prewarm_in_background(get_access_stats(), lambda key: render_view(key, data_version), default_views)
+
+# Progressive rendering. The adequacy headline needs only the selected row, so it
+# is drawn as soon as a district is selected. The inputs of the sections below it
+# (the district payload, schools, distributions, similar districts and the plotly
+# import) are started together in one thread pool shared by all sessions, and each
+# section waits only for its own, behind an st.empty() slot that says it is loading
+# until its input is ready. Streamlit sends elements as they are drawn, so the page
+# fills in top to bottom as those finish, and the finished page looks the same as before.
+
+PAGE_WORKERS = 4
+
+@st.cache_resource
+def get_page_pool():
+    """One section pool per server process"""
+    return ThreadPoolExecutor(max_workers=PAGE_WORKERS, thread_name_prefix="page_section")
+
+def start_sections(selection, df_filtered, is_district):
+    """Submit the tab1 section inputs, returning {section: future}.
+
+    A rerun replaces the previous run's page, so its inputs that haven't started
+    yet are cancelled (ones already running finish and are cached).
+    """
+    for future in st.session_state.get("page_sections", {}).values():
+        future.cancel()
+    pool = get_page_pool()
+    futures = {
+        "district": pool.submit(get_district_view, selection, data_version),
+        "distributions": pool.submit(build_distributions, df, data_version),
+        "plotly": pool.submit(importlib.import_module, "plotly.express"),
+    }
+    if is_district:
+        futures["schools"] = pool.submit(get_schools, df_filtered["RCDTS"].iloc[0])
+        futures["similar"] = pool.submit(find_similar_districts, selection, 5)
+    st.session_state.page_sections = futures
+    return futures
+
+def section_result(section, label):
+    """Wait for a section's input, showing label in the section's slot until it is ready"""
+    future = st.session_state.page_sections[section]
+    slot = st.empty()
+    if not future.done():
+        slot.caption(f"Loading {label}…")
+    result = future.result()
+    slot.empty()
+    return result
+
+# Deep links. The current view is mirrored into the URL query string so a shared
+# link opens the same view. Query values only seed widgets on a session's first run.
+
+LEG_FILTER_PARAMS = {"chamber": "Chamber & District", "legislator": "Legislator Name"}
+
+def init_from_query(key, param, options, convert=str):
+    """Seed st.session_state[key] from a query parameter if it is one of the options"""
+    if key in st.session_state or param not in st.query_params:
+        return
+    try:
+        value = convert(st.query_params[param])
+    except ValueError:
+        return
+    if value in options:
+        st.session_state[key] = value
+
+def sync_query_params(params):
+    """Write the view parameters to the URL, leaving out defaults (None)"""
+    params = {param: str(value) for param, value in params.items() if value is not None}
+    if st.query_params.to_dict() != params:
+        st.query_params.from_dict(params)
+
+# Legislative selection, shared by the full and lite pages. The widgets use the same
+# keys on both, so a selection carries over when switching between them.
+
+def legislative_selection(horizontal=False):
+    """Draw the legislative filter and selection widgets.
+
+    Returns the selected view (("legislative", chamber, district) or
+    ("legislator", name)), its legislative_view payload and its URL parameters.
+    """
+    init_from_query("leg_filter", "filter", list(LEG_FILTER_PARAMS.values()), LEG_FILTER_PARAMS.get)
+    filter_type = st.radio("Filter by:", ["Chamber & District", "Legislator Name"], key="leg_filter", horizontal=horizontal)
+    params = {"filter": None, "chamber": None, "leg_district": None, "legislator": None}
 
-    # Revenue melt
+    if filter_type == "Chamber & District":
+        # Chamber selection
+        chambers = sorted(df_leg['Chamber'].unique())
+        init_from_query("chamber", "chamber", chambers)
+        selected_chamber = st.selectbox("Select ILGA Chamber:", chambers, key="chamber")
 
-    df_revenue = pd.melt(
-        df_filtered,
-        id_vars=["RCDTS"],
-        value_vars=[
-             "Local Property Taxes (%)", "Other Local Funding (%)", 
-            "Evidence-Based Funding (%)", "Other State Funding (%)", 
-            "Federal Funding (%)"
-        ],
-        var_name="Revenue Source",
-        value_name="Revenue Percentages"
-        )
-    
-    # Revenue column name formatting
+        # District selection (filtered by chamber)
+        available_districts = sorted(df_leg[df_leg['Chamber'] == selected_chamber]['District Number'].unique())
+        init_from_query("leg_district", "leg_district", available_districts, int)
+        selected_district = st.selectbox("Select by District:", available_districts, key="leg_district")
 
-    df_revenue["Revenue Source"] = df_revenue["Revenue Source"].str.replace(" (%)", "", regex=False)
+        view = ("legislative", selected_chamber, int(selected_district))
+        leg_view = get_legislative_view(selected_chamber, int(selected_district), None, data_version)
+        params["chamber"] = selected_chamber if selected_chamber != chambers[0] else None
+        params["leg_district"] = selected_district if selected_district != available_districts[0] else None
+    else:
+        # Legislator selection
+        legislators = sorted(df_leg['Legislator Name'].dropna().unique())
+        init_from_query("legislator", "legislator", legislators)
+        selected_legislator = st.selectbox("Select by Legislator:", legislators, key="legislator")
+
+        view = ("legislator", selected_legislator)
+        leg_view = get_legislative_view(None, None, selected_legislator, data_version)
+        params["filter"] = "legislator"
+        params["legislator"] = selected_legislator
+
+    record_view(*view)
+    return view, leg_view, params
+
+# Lite mode (see lite.py). Phones and browsers asking to save data get a page of
+# plain HTML tables and SVG bars, without the header photo, web fonts, page CSS or
+# Plotly. ?lite=1 and ?lite=0 override the detection.
+
+def use_lite_mode():
+    """Decide once per session whether to show the lite page"""
+    if "lite" not in st.session_state:
+        lite_param = st.query_params.get("lite")
+        if lite_param in ("0", "1"):
+            st.session_state.lite = lite_param == "1"
+        else:
+            headers = st.context.headers
+            st.session_state.lite = (
+                headers.get("Save-Data", "").lower() == "on"
+                or headers.get("Sec-CH-UA-Mobile") == "?1"
+                or "Mobi" in headers.get("User-Agent", "")
+            )
+    return st.session_state.lite
+
+def show_full_version():
+    st.session_state.lite = False
+    st.query_params["lite"] = "0"
+
+def lite_page():
+    """Render the lite page and return its view parameters for the URL"""
+    from lite import district_page, legislative_page
+
+    st.markdown("#### PEER - Illinois District Funding Tool")
+    districts = list(df['District Name (IRC)'].unique()) + list(df_rollups['District Name (IRC)'])
+    default_district = "State of Illinois" if "State of Illinois" in districts else districts[0]
+    lite_tab1, lite_tab2 = st.tabs(["District Resource Needs", "Legislative View"])
+
+    with lite_tab1:
+        init_from_query("district", "district", districts)
+        if "district" not in st.session_state:
+            st.session_state.district = default_district
+        selection = st.selectbox("Select a district, county or region:", districts, key="district")
+        df_filtered = process_filtered_data(selection)
+        legislators = find_legislators(df_filtered["RCDTS"].iloc[0]) if not df_filtered.empty else []
+        is_rollup = selection in set(df_rollups['District Name (IRC)'])
+        st.html(district_page(get_district_view(selection, data_version), legislators, is_rollup))
+        record_view("district", selection)
+
+    with lite_tab2:
+        _, leg_view, leg_params = legislative_selection(horizontal=True)
+        st.html(legislative_page(leg_view))
+
+    st.button("🖥️ Full version (charts and maps)", key="full_version_button", on_click=show_full_version)
+
+    # The staffing resource and per pupil toggle aren't shown here (the lite page lists
+    # every resource and both dollar views), so they pass through from the URL.
+
+    return {
+        "district": selection if selection != default_district else None,
+        "per_pupil": st.query_params.get("per_pupil"),
+        "resource": st.query_params.get("resource"),
+        **leg_params,
+        "lite": st.query_params.get("lite")
+    }
 
-    # Resource filter formatting
+if df is not None and df_leg is not None:
+    start_prewarm(data_version)
+if st.query_params.get("warmup") == "1":
+    st.stop()
 
-    resource_filter = "Total Resources (Dollar Amount)"
-    df_resource = df_merged[df_merged["Resource"] == resource_filter]
-    
-    # Get the actual and adequate resources variables
-    
-    actual_resources = df_resource["Actual"].iloc[0]
-    adequate_resources = df_resource["Adequate resources"].iloc[0]
-    ase = df_resource["Total ASE"].iloc[0]
-    
-    return actual_resources, adequate_resources, ase, df_merged, df_demographics, df_revenue, illinois_negative_gap_sum, illinois_negative_gap_sum_perschool 
+if df is not None and df_leg is not None and use_lite_mode():
+    sync_query_params(lite_page())
+    st.stop()
 
 # HEADER
 
@@ -301,7 +689,7 @@ with stylable_container(
     with col2:
         st.markdown('<span class="header-title">PEER - Illinois District Funding Tool</span>', unsafe_allow_html=True) # Erykah - Header title. 
         
-tab0,tab1,tab2,tab3 = st.tabs(["Landing Page","District Resource Needs","Legislative View","About"]) # Erykah - Change tab names
+tab0,tab1,tab2,tab4,tab3 = st.tabs(["Landing Page","District Resource Needs","Legislative View","Compare Districts","About"]) # Erykah - Change tab names
 
 with tab0:
     st.header("Erykah! This is a header text")
@@ -329,9 +717,11 @@ Every space is a new line.
 
 if df is not None and df_leg is not None:
     
-# Get unique districts and set default to "State of Illinois"
+# Get unique districts (followed by county and region rollups) and set default to "State of Illinois"
 
    districts = df['District Name (IRC)'].unique() # This was a relic from when we used long data. It's superfluous now since data is wide not long but it is functional.
+   rollup_names = list(df_rollups['District Name (IRC)'])
+   districts = list(districts) + rollup_names
    default_index = 0
    if "State of Illinois" in districts:
        default_index = list(districts).index("State of Illinois")
@@ -350,11 +740,17 @@ with tab1:
 
         """,
     ):
-        st.markdown("<h5>Select a district to view resource needs</h5>",unsafe_allow_html=True)
+        st.markdown("<h5>Select a district, county or region to view resource needs</h5>",unsafe_allow_html=True)
 
-    selection = st.selectbox("", districts, index=default_index)
+    init_from_query("district", "district", districts)
+    if "district" not in st.session_state:
+        st.session_state.district = districts[default_index]
+    selection = st.selectbox("", districts, key="district")
     df_filtered = process_filtered_data(selection)
 
+is_district = selection != "State of Illinois" and selection not in rollup_names
+start_sections(selection, df_filtered, is_district)
+record_view("district", selection)
 adequacy_level = df_filtered["Adequacy Level"].unique()[0]
 
 # Adequacy level and adequacy gaps CSS
@@ -486,41 +882,26 @@ with tab1:
         </div>
         """, unsafe_allow_html=True)
 
-    # Data processing and calculations for adequacy funding metrics
+    # Adequacy funding metrics (computed in views.district_view)
 
-    if 'df_filtered' in locals() and not df_filtered.empty:
-    
-    # First filter by the value "Total Resources (Dollar Amount)"
-
-        actual_resources, adequate_resources, ase, df_merged, df_demographics, df_revenue, illinois_negative_gap_sum, illinois_negative_gap_sum_perschool = calculate_funding_metrics(df_filtered)
-    
-    # Calculate per pupil values
-    
-    actual_per_pupil = actual_resources / ase if ase > 0 else 0
-    adequate_per_pupil = adequate_resources / ase if ase > 0 else 0
-    if selection == "State of Illinois":
-        gap_per_pupil = illinois_negative_gap_sum / ase if ase > 0 else 0
-    else:
-        gap_per_pupil = actual_per_pupil - adequate_per_pupil
+    district_payload = section_result("district", "funding metrics")
+    df_demographics = district_payload["df_demographics"]
+    df_revenue = district_payload["df_revenue"]
 
     # Determine which values to display based on button state (full or per pupil funding)
     if 'show_per_pupil' not in st.session_state:
-        st.session_state.show_per_pupil = False
+        st.session_state.show_per_pupil = st.query_params.get("per_pupil") == "1"
 
     if st.session_state.show_per_pupil:
-        display_adequate = adequate_per_pupil
-        display_actual = actual_per_pupil
-        display_gap = gap_per_pupil
+        display_adequate = district_payload["adequate_per_pupil"]
+        display_actual = district_payload["actual_per_pupil"]
+        display_gap = district_payload["gap_per_pupil"]
         currency_format = "${:,.0f}"
         chart_title_suffix = " (Per Pupil)"
     else:
-        display_adequate = adequate_resources
-        display_actual = actual_resources
-        if selection == "State of Illinois":
-            display_gap =  -5679275708 
-
-        else:
-            display_gap = actual_resources - adequate_resources
+        display_adequate = district_payload["adequate"]
+        display_actual = district_payload["actual"]
+        display_gap = district_payload["gap"]
         currency_format = "${:,.0f}"
         chart_title_suffix = ""
 
@@ -683,45 +1064,67 @@ with tab1:
 
 
 
+    # Expandable container for the district's legislators
+
+    with st.expander("🏛️ Your Legislators 🏛️"):
+        legislators = find_legislators(df_filtered["RCDTS"].iloc[0]) if not df_filtered.empty else []
+        if legislators:
+            df_legislators = pd.DataFrame(legislators, columns=['Chamber', 'District', 'Legislator', 'Share of Students'])
+            st.markdown(f"State legislators whose districts include students in {selection}:")
+            st.dataframe(
+                df_legislators.style.format({
+                'Share of Students': "{:.0%}"
+                }).set_properties(**{'text-align': 'center'}), hide_index=True)
+        else:
+            st.text("Select a school district to see the state legislators who represent it.")
+
+    # Expandable container for the district's schools (only its school file is read)
+
+    with st.expander("🏫 Schools 🏫"):
+        if not is_district:
+            st.text("Select a school district to see its schools.")
+        elif (df_district_schools := section_result("schools", "schools")) is None:
+            st.text("School-level data for this district hasn't been built yet (see build_school_partitions.py).")
+        else:
+            schools_payload = school_view(df_district_schools, district_payload)
+            st.markdown(f"Staffing (FTE) at each school in {selection}:")
+            st.dataframe(
+                schools_payload["df_school_staffing"].style.format({
+                'Enrollment': "{:,.0f}",
+                **dict.fromkeys(STAFFING_RESOURCES, "{:,.1f}")
+                }, na_rep="-").set_properties(**{'text-align': 'center'}), hide_index=True)
+            st.markdown("Adequate staffing gaps by position, in total and per school:")
+            st.dataframe(
+                schools_payload["df_position_gaps"].style.format({
+                'District Gap': "{:,.1f}",
+                'Gap Per School': "{:,.2f}",
+                'Staff Per School': "{:,.1f}"
+                }, na_rep="-").set_properties(**{'text-align': 'center'}), hide_index=True)
+            st.markdown("Student demographics at each school:")
+            st.dataframe(
+                schools_payload["df_school_demo"].style.format("{:.0%}", subset=schools_payload["df_school_demo"].columns[1:], na_rep="-")
+                .set_properties(**{'text-align': 'center'}), hide_index=True)
+
     with st.expander("👩‍🏫 From Dollars to Desks: Adequate Staffing 👩‍⚕️", expanded=False):
     
         # Create a drop down menue that filters by resource types:
 
-        resource_filter = st.selectbox("Select Resource Type", options=[
-            "Core and Specialist Teachers",
-            "Special Education Teachers",
-            "Counselors",
-            "Nurses",
-            "Psychologists",
-            "Principals",
-            "Assistant Principals",
-            "EL Teachers"
-        ])   
+        init_from_query("resource", "resource", STAFFING_RESOURCES)
+        resource_filter = st.selectbox("Select Resource Type", options=STAFFING_RESOURCES, key="resource")
     
-        # Filter the dataframe based on the selected resource type
-
-        df_resource = df_merged[df_merged["Resource"] == resource_filter]
+        # Staffing gap (per school for districts and rollups) for the selected resource type
 
-        # Get the adequacy gap per school for the selected resource type
-
-        adequacy_gap_per_school = df_resource["Gaps Per School"].iloc[0] if not df_resource.empty else 0
-        adequacy_gap = df_resource["Gaps"].iloc[0] if not df_resource.empty else 0
-        resource_type = resource_filter.lower()
-        if selection == "State of Illinois":
-                if adequacy_gap >= 0:  # Positive gap (adequately staffed)
-                    st.text(f"According to the EBF formula, Illinois schools are adequately staffed with {resource_type}, but this may not reflect the on the ground needs at your school.")
-                else:  # Negative gap (understaffed)
-                    st.text(f"A fully funded EBF formula could mean {abs(adequacy_gap):,.0f} more {resource_type} in Illinois.")
-        else:  # Specific district selected
-            if adequacy_gap_per_school >= 0:  # Positive gap (adequately staffed)
-                    st.text(f"According to the EBF formula, your school district is adequately staffed with {resource_type}, but this may not reflect the on the ground needs at your school.")
-            else:  # Negative gap (understaffed)
-                    st.text(f"A fully funded EBF formula could mean {abs(adequacy_gap_per_school):.2f} more {resource_type} per school in your district.")
+        st.text(staffing_sentence(district_payload, resource_filter, is_rollup=selection in rollup_names))
 
     # Expandable container for revenue sources
 
     with st.expander("💰 Revenue by Source 💰"):
-        
+
+        # Deferred import (see top of file). Already loaded, or loading, by the
+        # "plotly" section input, so the first full page waits on it here.
+
+        import plotly.express as px
+
         # Create a bar chart for revenue sources
         fig_rev = px.bar(
         df_revenue, 
@@ -843,47 +1246,149 @@ with tab1:
         
         st.plotly_chart(fig_demo, use_container_width=True)
 
+    # Expandable container for statewide distributions
+
+    with st.expander("📊 How Districts Compare 📊"):
+        dist_metric = st.selectbox("Compare:", list(DISTRIBUTION_METRICS), key="dist_metric")
+        dist_column, dist_tickformat, dist_format = DISTRIBUTION_METRICS[dist_metric]
+        distribution = section_result("distributions", "distributions")[dist_metric]
+        quantiles = distribution["quantiles"]
+        st.markdown(f"Across Illinois school districts, the median is **{dist_format.format(quantiles[0.5])}** "
+                    f"and the middle half of districts fall between {dist_format.format(quantiles[0.25])} and {dist_format.format(quantiles[0.75])}.")
+
+        # Deferred import (see top of file)
+
+        import plotly.graph_objects as go
+
+        edges = distribution["edges"]
+        fig_dist = go.Figure(go.Bar(
+            x=(edges[:-1] + edges[1:]) / 2,
+            y=distribution["counts"],
+            width=edges[1] - edges[0],
+            marker_color='#8c8dac',
+            hovertemplate="%{y} districts<extra></extra>"
+        ))
+        # The statewide row holds state totals (and -inf for the per school metrics),
+        # so only districts and rollups are placed on the chart
+
+        dist_value = df_filtered[dist_column].iloc[0] if not df_filtered.empty else np.nan
+        if selection != "State of Illinois" and np.isfinite(dist_value):
+            fig_dist.add_vline(
+                x=min(max(dist_value, edges[0]), edges[-1]),
+                line_color='#C4384D',
+                line_width=3,
+                annotation_text=f"{selection}: {dist_format.format(dist_value)}",
+                annotation_font_color='#C4384D'
+            )
+            st.markdown(f"{selection} is higher than {percentile_rank(distribution, dist_value) * 100:.0f}% of districts.")
+        fig_dist.update_layout(
+            showlegend=False,
+            height=350,
+            bargap=0.05,
+            margin=dict(t=40),
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+            font=dict(color='#141554'),
+            xaxis=dict(tickformat=dist_tickformat, title=dist_metric),
+            yaxis=dict(title="Districts"),
+            uirevision=dist_metric
+        )
+        st.plotly_chart(fig_dist, use_container_width=True)
+        st.caption("Districts beyond the 1st and 99th percentiles are counted in the end bars.")
+
+    # Expandable container for the statewide map
+
+    with st.expander("🗺️ Statewide Map 🗺️"):
+
+        # Expander contents are sent even when collapsed, so the boundaries are only
+        # drawn (and sent) once the map is switched on
+
+        if st.toggle("Show the map", key="show_map"):
+            map_layer_label = st.radio("Show:", list(MAP_LAYER_LABELS), horizontal=True, key="map_layer")
+            map_metric = st.selectbox("Color by:", list(MAP_METRICS), key="map_metric")
+            map_zoom = st.radio("Detail:", list(ZOOM_LEVELS), horizontal=True, key="map_zoom")
+            map_layer = MAP_LAYER_LABELS[map_layer_label]
+            map_format, map_midpoint, map_reversed = MAP_METRICS[map_metric]
+            map_geojson = get_map_geometry(map_layer, map_zoom)
+
+            if map_geojson is None:
+                st.text("Map boundaries for this layer haven't been built yet (see build_geometries.py).")
+            else:
+
+                # Deferred import (see top of file)
+
+                import plotly.graph_objects as go
+
+                df_map = map_values(map_layer, data_version)
+                fig_map = go.Figure(go.Choroplethmap(
+                    geojson=map_geojson,
+                    featureidkey="id",
+                    locations=df_map["key"],
+                    z=df_map[map_metric],
+                    zmid=map_midpoint,
+                    colorscale=[[0, '#C4384D'], [0.5, '#f7f7f7'], [1, '#20a3bc']],
+                    reversescale=map_reversed,
+                    text=df_map["Name"],
+                    hovertemplate="%{text}<br>" + map_metric + ": %{z:" + map_format + "}<extra></extra>",
+                    colorbar=dict(tickformat=map_format),
+                    marker_line_width=0.3,
+                    marker_line_color='white'
+                ))
+                fig_map.update_layout(
+                    map_style="carto-positron",
+                    map_center={"lat": 39.8, "lon": -89.2},
+                    map_zoom=5.2,
+                    height=650,
+                    margin=dict(t=0, b=0, l=0, r=0),
+                    uirevision=map_layer
+                )
+                st.plotly_chart(fig_map, use_container_width=True)
+
+    # Expandable container for similar districts
+
+    with st.expander("🔍 Similar Districts 🔍"):
+        if not is_district:
+            st.text("Select a school district to see districts with similar students, revenue sources and funding.")
+        else:
+            similar_names, similar_distances = section_result("similar", "similar districts")
+            df_similar = df.set_index('District Name (IRC)').loc[similar_names].reset_index()
+            df_similar = df_similar[['District Name (IRC)',
+                                     'Adequacy Level',
+                                     'Adequacy Funding Gap Per Student',
+                                     'Total ASE',
+                                     'Low Income (%)']]
+            df_similar.columns = ['School District',
+                                  'Adequacy Level',
+                                  'Funding Gap Per Student',
+                                  'Students (ASE)',
+                                  'Low Income']
+            st.markdown("Districts with the most similar demographics, revenue sources, size and adequacy level:")
+            st.dataframe(
+                df_similar.style.format({
+                'Adequacy Level': "{:.0%}",
+                'Funding Gap Per Student': "${:,.0f}",
+                'Students (ASE)': "{:,.0f}",
+                'Low Income': "{:.0%}"
+                }).set_properties(**{'text-align': 'center'}), hide_index=True)
+
+    # Expandable container for data downloads
+
+    with st.expander("⬇️ Download the Data ⬇️"):
+        if selection != "State of Illinois":
+            download_scope = "rollup" if selection in rollup_names else "district"
+            download_buttons(download_scope, selection, selection, key="download_district")
+        download_buttons("statewide", None, "All Illinois districts", key="download_statewide_tab1")
+
 with tab2:
     st.subheader("Legislative View - Illinois School District Funding Needs")
     
     # Filter options
-    filter_type = st.radio(
-        "Filter by:",
-        ["Chamber & District", "Legislator Name"]
-    )
-    
-    if filter_type == "Chamber & District":
-        # Chamber selection
-        chambers = sorted(df_leg['Chamber'].unique())
-        selected_chamber = st.selectbox("Select ILGA Chamber:", chambers)
-        
-        # District selection (filtered by chamber)
-        available_districts = sorted(df_leg[df_leg['Chamber'] == selected_chamber]['District Number'].unique())
-        selected_district = st.selectbox("Select by District:", available_districts)
-        
-        # Filter data
-        filtered_df = df_leg[(df_leg['Chamber'] == selected_chamber) & (df_leg['District Number'] == selected_district)]
-        
-        # Display selection
-        st.subheader(f"📊 {filtered_df['Legislator Name'].values[0]} ({selected_chamber} District {selected_district})")
-
-        df = filtered_df.merge(df,on="RCDTS",how="left")
+    leg_selection, leg_view, leg_params = legislative_selection()
 
-    elif filter_type == "Legislator Name":  # Filter by Legislator
-        # Legislator selection
-        legislators = sorted(df_leg['Legislator Name'].dropna().unique())
-        selected_legislator = st.selectbox("Select by Legislator:", legislators)
-        
-        # Filter data
-        filtered_df = df_leg[df_leg['Legislator Name'] == selected_legislator]
-        
-        # Display selection
-        legislator_info = filtered_df.iloc[0]
-        st.subheader(f"📊 {selected_legislator} ({legislator_info['Chamber']} District {legislator_info['District Number']})")
+    # Display selection
+    st.subheader(leg_view["title"])
 
-        df = filtered_df.merge(df,on="RCDTS",how="left")    
-    
-    df_schools = df[['School District','Total Students','Share of Students']]
+    df_schools = leg_view["df_schools"]
 
     st.subheader("School Districts Covered and Share of Students")
 
@@ -895,9 +1400,7 @@ with tab2:
     
     st.subheader("Adequacy Funding Gaps and Levels")
 
-    df_adequacy_stats = df[['School District','Adequacy Funding Gap',
-                            'Adequacy Funding Gap Per Student',
-                            'Adequacy Level']]
+    df_adequacy_stats = leg_view["df_adequacy_stats"]
 
     st.dataframe(
         df_adequacy_stats.style.format({
@@ -908,24 +1411,7 @@ with tab2:
     
     st.subheader("Adequacy Funding Gaps by Position")
 
-    df_adequacy_pos = df[['School District','Core and Specialist Teachers Gap (EIS)',
-                          'Special Education Teachers Gap (EIS)', 
-                          'Counselors Gap (IRC)',
-                          'Nurses Gap (IRC)', 
-                          'Psychologists Gap (IRC)', 
-                          'Principals Gap (EIS)',
-                          'Assistant Principals Gap (EIS)', 
-                          'EL Teachers Gap (EIS)']]
-
-    df_adequacy_pos.columns = ['School District',
-                               'Core and Specialist Teachers',
-                               'Special Education Teachers', 
-                               'Counselors',
-                               'Nurses', 
-                               'Psychologists', 
-                               'Principals',
-                               'Assistant Principals', 
-                               'EL Teachers']
+    df_adequacy_pos = leg_view["df_adequacy_pos"]
 
     st.dataframe(
         df_adequacy_pos.style.format({
@@ -941,7 +1427,7 @@ with tab2:
 
     # st.subheader("Adequacy Funding Gaps by Position (Per School)")
 
-    # df_adequacy_pos_per_school = df[['School District',
+    # df_adequacy_pos_per_school = leg_view["df_leg_view"][['School District',
     #                       'Core and Specialist Teachers Gap Per School',
     #                       'Special Education Teachers Gap Per School',
     #                       'Counselors Gap Per School', 
@@ -975,27 +1461,7 @@ with tab2:
 
     st.subheader("Demographics")
 
-    df_demo = df[['School District',
-                  'White (%)',
-                  'Black (%)',
-                  'Latine (%)',
-                  'Asian (%)',
-                  'Native Hawaiian or Other Pacific Islander (%)',
-                  'American Indian or Alaska Native (%)',
-                  'IEP (%)',
-                  'EL (%)',
-                  'Low Income (%)']]
-
-    df_demo.columns = ['School District',
-                  'White',
-                  'Black',
-                  'Latine',
-                  'Asian',
-                  'Native Hawaiian or Other Pacific Islander',
-                  'American Indian or Alaska Native',
-                  'IEP',
-                  'EL',
-                  'Low Income']
+    df_demo = leg_view["df_demo"]
 
     st.dataframe(
         df_demo.style.format({
@@ -1012,20 +1478,7 @@ with tab2:
 
     st.subheader("Revenue Sources")
 
-    df_rev = df[['School District',
-                  'Local Property Taxes (%)', 
-                  'Other Local Funding (%)',
-                  'Evidence-Based Funding (%)', 
-                  'Other State Funding (%)',
-                  'Federal Funding (%)']]
-
-    df_rev.columns = ['School District',
-                  'Local Property Taxes', 
-                  'Other Local Funding',
-                  'Evidence-Based Funding', 
-                  'Other State Funding',
-                  'Federal Funding']
-    
+    df_rev = leg_view["df_rev"]
 
     st.dataframe(
         df_rev.style.format({
@@ -1036,6 +1489,49 @@ with tab2:
             'Federal Funding':"{:.1%}"
             }).set_properties(**{'text-align': 'center'}), hide_index=True)
 
+    st.subheader("Download the Data")
+
+    if leg_selection[0] == "legislative":
+        _, selected_chamber, selected_district = leg_selection
+        download_buttons("legislative", (selected_chamber, selected_district), f"{selected_chamber} District {selected_district}", key="download_legislative")
+    else:
+        download_buttons("legislator", leg_selection[1], leg_selection[1], key="download_legislator")
+    download_buttons("statewide", None, "All Illinois districts", key="download_statewide_tab2")
+
+
+with tab4:
+    st.subheader("Compare Districts Side by Side")
+
+    compare_selection = st.multiselect(
+        f"Select up to {COMPARISON_MAX_DISTRICTS} districts, counties or regions:",
+        districts,
+        default=["State of Illinois"] if "State of Illinois" in districts else None,
+        max_selections=COMPARISON_MAX_DISTRICTS
+    )
+
+    if compare_selection:
+        df_compare_funding, df_compare_positions, df_compare_revenue, df_compare_demo = compare_districts(tuple(compare_selection), data_version)
+
+        st.subheader("Adequacy Funding")
+        dollar_rows = ["School Funding Needs", "School Funding Resources", "School Funding Gap",
+                       "Needs Per Pupil", "Resources Per Pupil", "Gap Per Pupil"]
+        st.dataframe(
+            df_compare_funding.style
+            .format("{:.0%}", subset=pd.IndexSlice[["Adequacy Level"], :], na_rep="-")
+            .format("${:,.0f}", subset=pd.IndexSlice[dollar_rows, :], na_rep="-")
+            .format("{:,.0f}", subset=pd.IndexSlice[["Students (ASE)"], :], na_rep="-")
+            .set_properties(**{'text-align': 'center'}))
+
+        st.subheader("Adequacy Funding Gaps by Position")
+        st.dataframe(df_compare_positions.style.format("{:,.0f}", na_rep="-").set_properties(**{'text-align': 'center'}))
+
+        st.subheader("Revenue Sources")
+        st.dataframe(df_compare_revenue.style.format("{:.1%}", na_rep="-").set_properties(**{'text-align': 'center'}))
+
+        st.subheader("Demographics")
+        st.dataframe(df_compare_demo.style.format("{:.1%}", na_rep="-").set_properties(**{'text-align': 'center'}))
+    else:
+        st.text("Select at least one district to compare.")
 
 with tab3:
     st.header("About the PEER Resource Lookup Tool") 
@@ -1070,3 +1566,13 @@ Used to calculate students in legislative districts as a percentage of their res
 **Note:** For dollar-amount adequacy gaps (referred to as the *school funding gap* in the **District Resource Needs** tab), we use the EBF Distribution Calculation. For adequate position gaps, we subtract the actual positions (from the Illinois Report Card and Educator Employment Information) from the adequate staffing levels provided in the EBF Distribution Calculation.                                               
                 """,unsafe_allow_html=True)
                                  
+
+# Mirror the current view into the URL (defaults are left out)
+
+sync_query_params({
+    "district": selection if selection != districts[default_index] else None,
+    "per_pupil": "1" if st.session_state.show_per_pupil else None,
+    "resource": resource_filter if resource_filter != STAFFING_RESOURCES[0] else None,
+    **leg_params,
+    "lite": st.query_params.get("lite")
+})
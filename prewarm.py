@@ -0,0 +1,176 @@
+# PEER app cache prewarming
+# Counts which district and legislative views visitors open (per day, in
+# access_stats.json) and, on a server process's first session or the first one
+# after the data changes, computes the most viewed ones in a background thread
+# pool so their first visitors get cached pages. The app starts the prewarm and
+# never waits for it; multiworker.py opens that session itself at worker startup
+# and after a refresh.
+# Usage: python prewarm.py [--top 20]   # show the hottest views and the last prewarm
+
+import argparse
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+# PEER_ACCESS_STATS moves the counts out of the app directory (the tests use it)
+
+ACCESS_STATS_FILE = os.environ.get("PEER_ACCESS_STATS") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "access_stats.json")
+
+# Days of traffic that count as recent, and days kept in the file
+
+RECENT_DAYS = 7
+KEEP_DAYS = 30
+
+# Views computed per prewarm, worker threads, and how often counts are written
+
+PREWARM_VIEWS = 50
+PREWARM_WORKERS = 2
+FLUSH_SECONDS = 60
+
+
+def view_key(*view):
+    """Key of a view, e.g. view_key("district", "Payson CUSD 1") or view_key("legislative", "House", 12)"""
+    return json.dumps(view)
+
+
+class AccessStats:
+    """View counts per day. Counts are kept in memory and merged into the file
+    every FLUSH_SECONDS, so several worker processes can share one file (a
+    flush that races another may drop a few counts)."""
+
+    def __init__(self, path=ACCESS_STATS_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.pending = Counter()
+        self.last_flush = time.monotonic()
+        atexit.register(self.flush)
+
+    def read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"days": {}}
+
+    def write(self, stats):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(stats, f)
+        os.replace(tmp_path, self.path)
+
+    def record(self, key):
+        with self.lock:
+            self.pending[key] += 1
+            due = time.monotonic() - self.last_flush > FLUSH_SECONDS
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+            self.last_flush = time.monotonic()
+        if not pending:
+            return
+        stats = self.read()
+        today = date.today().isoformat()
+        counts = Counter(stats["days"].get(today, {}))
+        counts.update(pending)
+        stats["days"][today] = dict(counts)
+        oldest = (date.today() - timedelta(days=KEEP_DAYS)).isoformat()
+        stats["days"] = {day: day_counts for day, day_counts in stats["days"].items() if day >= oldest}
+        self.write(stats)
+
+    def hottest(self, n=PREWARM_VIEWS, days=RECENT_DAYS):
+        """The n most viewed keys over the last days, with counts, and the total count"""
+        first_day = (date.today() - timedelta(days=days - 1)).isoformat()
+        counts = Counter()
+        for day, day_counts in self.read()["days"].items():
+            if day >= first_day:
+                counts.update(day_counts)
+        with self.lock:
+            counts.update(self.pending)
+        return counts.most_common(n), sum(counts.values())
+
+    def save_prewarm(self, result):
+        stats = self.read()
+        stats["last_prewarm"] = result
+        self.write(stats)
+
+
+def prewarm(stats, render, always=(), n=PREWARM_VIEWS, workers=PREWARM_WORKERS):
+    """Render the views in always plus the n hottest, and return a report.
+
+    render(key) computes and caches one view. Coverage is the share of recent
+    views that were prewarmed.
+    """
+    start = time.perf_counter()
+    hottest, total = stats.hottest(n)
+    keys = list(dict.fromkeys(list(always) + [key for key, _ in hottest]))
+    covered = sum(count for key, count in hottest if key in keys)
+
+    failures = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prewarm") as pool:
+        for future in [pool.submit(render, key) for key in keys]:
+            try:
+                future.result()
+            except Exception:
+                failures += 1
+
+    result = {
+        "finished": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "views": len(keys),
+        "failures": failures,
+        "seconds": round(time.perf_counter() - start, 2),
+        "coverage": round(covered / total, 3) if total else None,
+    }
+    stats.save_prewarm(result)
+    coverage = f"{result['coverage']:.0%}" if total else "n/a"
+    print(f"Prewarmed {len(keys)} views in {result['seconds']}s ({coverage} of recent traffic, {failures} failures)")
+    return result
+
+
+# Threads that compute cached values with no Streamlit session attached (the
+# prewarm pool, and the app's page section pool). Streamlit warns that they have
+# no script context, which is expected for them.
+
+BACKGROUND_THREADS = ("prewarm", "page_section")
+
+
+def outside_background_threads(record):
+    """Logging filter dropping records from BACKGROUND_THREADS"""
+    return not record.threadName.startswith(BACKGROUND_THREADS)
+
+
+def prewarm_in_background(stats, render, always=()):
+    """Start prewarm in a daemon thread and return the thread"""
+    thread = threading.Thread(target=prewarm, args=(stats, render, always), name="prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the PEER app's most viewed pages and the last cache prewarm.")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--days", type=int, default=RECENT_DAYS)
+    args = parser.parse_args()
+
+    stats = AccessStats()
+    hottest, total = stats.hottest(args.top, args.days)
+    print(f"{total:,} views in the last {args.days} days")
+    for key, count in hottest:
+        print(f"  {count:6,}  {' '.join(str(part) for part in json.loads(key))}")
+    last = stats.read().get("last_prewarm")
+    if last:
+        coverage = f"{last['coverage']:.0%}" if last["coverage"] is not None else "n/a"
+        print(f"Last prewarm {last['finished']}: {last['views']} views in {last['seconds']}s, "
+              f"{coverage} of recent traffic covered, {last['failures']} failures")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+# PEER app regression check
+# Recomputes what the app shows for every district, county, region and
+# legislative district (through views.py, the same code the app renders from),
+# compares it with golden snapshots and checks time and memory budgets per stage.
+# Snapshots are rendered across processes, one chunk of views per worker; the
+# budgeted timings are taken serially in the main process, so they don't depend
+# on how many workers share the CPUs.
+#
+# Snapshots are versioned by a hash of the data files, so a data refresh needs a
+# new recording (after reviewing the differences): python regression_check.py record
+#
+# Usage: python regression_check.py check [--workers 8]
+#        python regression_check.py record
+# check exits with status 1 on any difference or budget overrun.
+# The pytest suite (tests/test_regression.py) compares a sample of views on every run.
+
+import argparse
+import gzip
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from rollups import build_rollups
+from validate_data import live_data_files
+from views import STAFFING_RESOURCES, district_view, legislative_view, staffing_sentence
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_FILES = list(live_data_files())
+GOLDEN_DIR = os.path.join(APP_DIR, "golden")
+
+# Budgets per stage: 95th percentile time per view (ms) and peak Python
+# allocations for one view (MB). "load" is reading the data and building rollups.
+
+TIME_BUDGETS_MS = {"load": 500, "district_view": 120, "legislative_view": 30}
+MEMORY_BUDGETS_MB = {"load": 20, "district_view": 1, "legislative_view": 1}
+
+# Views per stage timed (spread evenly over the stage) and traced for memory
+# (tracing slows the timed runs, so it's separate)
+
+TIMING_SAMPLE = 200
+MEMORY_SAMPLE = 3
+
+# Relative tolerance for numbers (anything larger is a change in what's displayed)
+
+RELATIVE_TOLERANCE = 1e-9
+
+
+def data_hash():
+    """Hash of the data files' contents, naming the snapshot that matches them"""
+    digest = hashlib.sha256()
+    for path in DATA_FILES:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def to_plain(value):
+    """Convert a view payload to JSON types (tables become columns and rows, NaN becomes None)"""
+    if isinstance(value, pd.DataFrame):
+        return {"columns": [str(column) for column in value.columns], "rows": to_plain(value.to_numpy().tolist())}
+    if isinstance(value, dict):
+        return {str(key): to_plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_plain(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+# Workers. Each loads the data once, then computes its chunk of views.
+
+_inputs = {}
+
+
+def load_inputs():
+    df = pd.read_parquet(DATA_FILES[0])
+    df_leg = pd.read_csv(DATA_FILES[1])
+    df_rollups = build_rollups(df)
+    _inputs.update(df=df, df_leg=df_leg, df_rollups=df_rollups,
+                   rollup_names=set(df_rollups["District Name (IRC)"]),
+                   all_rows=pd.concat([df, df_rollups], ignore_index=True))
+
+
+def render(stage, key):
+    """What the app shows for one view"""
+    if stage == "district_view":
+        all_rows = _inputs["all_rows"]
+        payload = district_view(all_rows[all_rows["District Name (IRC)"] == key], key)
+        payload["staffing_sentences"] = {
+            resource: staffing_sentence(payload, resource, key in _inputs["rollup_names"]) for resource in STAFFING_RESOURCES
+        }
+        return payload
+    chamber, district_number = key
+    payload = legislative_view(_inputs["df"], _inputs["df_leg"], chamber, district_number)
+    payload.pop("df_leg_view")  # the full join; the app shows the tables cut from it
+    return payload
+
+
+def run_chunk(stage, keys):
+    """Render keys, returning {key: plain payload}"""
+    if not _inputs:
+        load_inputs()
+    return {json.dumps(key): to_plain(render(stage, key)) for key in keys}
+
+
+def measure_stage(stage, keys):
+    """p95 ms per view over a sample of keys, timed one at a time, and peak MB for one view"""
+    sample = keys[::max(1, len(keys) // TIMING_SAMPLE)]
+    seconds = []
+    for key in sample:
+        start = time.perf_counter()
+        render(stage, key)
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    peak = 0
+    for key in keys[:MEMORY_SAMPLE]:
+        tracemalloc.reset_peak()
+        render(stage, key)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+    return float(np.percentile(seconds, 95)) * 1000, peak / 1e6
+
+
+def measure_load():
+    """Seconds and peak MB to load the data in this process"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    load_inputs()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    # Time again untraced (tracing inflates it)
+
+    start = time.perf_counter()
+    load_inputs()
+    return min(seconds, time.perf_counter() - start), peak / 1e6
+
+
+def render_all(workers):
+    """Render every view in parallel and measure each stage serially.
+    Returns (snapshot, {stage: (p95 ms, peak MB)}, seconds)"""
+    start = time.perf_counter()
+    load_seconds, load_peak = measure_load()
+    stages = {
+        "district_view": list(_inputs["df"]["District Name (IRC)"]) + list(_inputs["df_rollups"]["District Name (IRC)"]),
+        "legislative_view": [
+            [chamber, int(number)]
+            for chamber, number in _inputs["df_leg"][["Chamber", "District Number"]].drop_duplicates().itertuples(index=False)
+        ],
+    }
+
+    # Interleave the chunks so each worker gets a mix of small and large views
+
+    jobs = [(stage, keys[i::workers]) for stage, keys in stages.items() for i in range(workers)]
+    snapshot = {stage: {} for stage in stages}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [(stage, pool.submit(run_chunk, stage, keys)) for stage, keys in jobs if keys]
+        for stage, future in futures:
+            snapshot[stage].update(future.result())
+
+    measurements = {"load": (load_seconds * 1000, load_peak)}
+    for stage, keys in stages.items():
+        measurements[stage] = measure_stage(stage, keys)
+    return snapshot, measurements, time.perf_counter() - start
+
+
+def golden_path(version, stage):
+    return os.path.join(GOLDEN_DIR, version, f"{stage}.json.gz")
+
+
+def differences(golden, current, path=""):
+    """Yield (path, golden, current) for every value that differs"""
+    if isinstance(golden, dict) and isinstance(current, dict):
+        for key in golden.keys() | current.keys():
+            yield from differences(golden.get(key), current.get(key), f"{path}/{key}")
+    elif isinstance(golden, list) and isinstance(current, list) and len(golden) == len(current):
+        for i, (golden_item, current_item) in enumerate(zip(golden, current)):
+            yield from differences(golden_item, current_item, f"{path}[{i}]")
+    elif (isinstance(golden, (int, float)) and isinstance(current, (int, float))
+          and not isinstance(golden, bool) and not isinstance(current, bool)):
+        if not math.isclose(golden, current, rel_tol=RELATIVE_TOLERANCE, abs_tol=RELATIVE_TOLERANCE):
+            yield path, golden, current
+    elif golden != current:
+        yield path, golden, current
+
+
+def record(args):
+    version = data_hash()
+    snapshot, measurements, seconds = render_all(args.workers)
+    os.makedirs(os.path.join(GOLDEN_DIR, version), exist_ok=True)
+    for stage, outputs in snapshot.items():
+        # mtime=0 keeps the file identical when nothing changed
+
+        with gzip.GzipFile(golden_path(version, stage), "wb", mtime=0) as f:
+            f.write(json.dumps(outputs, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        print(f"Recorded {len(outputs):,} {stage} snapshots to {golden_path(version, stage)}")
+    print(f"Done in {seconds:.1f}s with {args.workers} workers")
+
+
+def check(args):
+    version = data_hash()
+    if not os.path.exists(golden_path(version, "district_view")):
+        print(f"No golden snapshots for data version {version}. Review the data, then run: python regression_check.py record")
+        sys.exit(1)
+    snapshot, measurements, seconds = render_all(args.workers)
+    failed = False
+
+    for stage, outputs in snapshot.items():
+        with gzip.open(golden_path(version, stage), "rt", encoding="utf-8") as f:
+            golden = json.load(f)
+        found = list(differences(golden, outputs))
+        print(f"{stage}: {len(outputs):,} views, {len(found):,} differences")
+        for path, golden_value, current_value in found[:args.show]:
+            print(f"  {path}: golden {golden_value!r}, now {current_value!r}")
+        failed = failed or bool(found)
+
+    print("Budgets (p95 time per view, peak memory per view):")
+    for stage, (ms, mb) in measurements.items():
+        over = ms > TIME_BUDGETS_MS[stage] or mb > MEMORY_BUDGETS_MB[stage]
+        print(f"  {stage:17} {ms:8.1f} ms / {TIME_BUDGETS_MS[stage]:5} ms  {mb:7.2f} MB / {MEMORY_BUDGETS_MB[stage]:4} MB"
+              f"{'  OVER BUDGET' if over else ''}")
+        failed = failed or over
+
+    print(f"{'FAILED' if failed else 'OK'} in {seconds:.1f}s with {args.workers} workers")
+    if failed:
+        sys.exit(1)
+
+
+def available_cpus():
+    """CPUs this process may run on (fewer than os.cpu_count() under an affinity mask)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check PEER app output against golden snapshots and performance budgets.")
+    parser.add_argument("command", choices=["check", "record"])
+    parser.add_argument("--workers", type=int, default=available_cpus())
+    parser.add_argument("--show", type=int, default=20, help="differences listed per stage")
+    args = parser.parse_args()
+    if args.command == "record":
+        record(args)
+    else:
+        check(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# PEER app regional and county rollups
+# Aggregates the district rows of the wide table to Regional Office of Education
+# (ROE) regions and counties, using the codes embedded in each district's RCDTS.
+# The app shows the rollups alongside districts; run directly to write them to CSV.
+# Usage: python rollups.py --out rollups.csv
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# RCDTS = Region (2) + County (3) + District (4) + Type (2) + School. ISBE's county
+# codes (e.g. 016 is Cook) are mostly alphabetical, but Macon through Massac
+# (055-061) come before McDonough, McHenry and McLean (062-064), so they are
+# listed by code.
+
+ILLINOIS_COUNTIES = {
+    "001": "Adams", "002": "Alexander", "003": "Bond", "004": "Boone", "005": "Brown", "006": "Bureau",
+    "007": "Calhoun", "008": "Carroll", "009": "Cass", "010": "Champaign", "011": "Christian", "012": "Clark",
+    "013": "Clay", "014": "Clinton", "015": "Coles", "016": "Cook", "017": "Crawford", "018": "Cumberland",
+    "019": "DeKalb", "020": "De Witt", "021": "Douglas", "022": "DuPage", "023": "Edgar", "024": "Edwards",
+    "025": "Effingham", "026": "Fayette", "027": "Ford", "028": "Franklin", "029": "Fulton", "030": "Gallatin",
+    "031": "Greene", "032": "Grundy", "033": "Hamilton", "034": "Hancock", "035": "Hardin", "036": "Henderson",
+    "037": "Henry", "038": "Iroquois", "039": "Jackson", "040": "Jasper", "041": "Jefferson", "042": "Jersey",
+    "043": "Jo Daviess", "044": "Johnson", "045": "Kane", "046": "Kankakee", "047": "Kendall", "048": "Knox",
+    "049": "Lake", "050": "LaSalle", "051": "Lawrence", "052": "Lee", "053": "Livingston", "054": "Logan",
+    "055": "Macon", "056": "Macoupin", "057": "Madison", "058": "Marion", "059": "Marshall", "060": "Mason",
+    "061": "Massac", "062": "McDonough", "063": "McHenry", "064": "McLean", "065": "Menard", "066": "Mercer",
+    "067": "Monroe", "068": "Montgomery", "069": "Morgan", "070": "Moultrie", "071": "Ogle", "072": "Peoria",
+    "073": "Perry", "074": "Piatt", "075": "Pike", "076": "Pope", "077": "Pulaski", "078": "Putnam",
+    "079": "Randolph", "080": "Richland", "081": "Rock Island", "082": "St. Clair", "083": "Saline", "084": "Sangamon",
+    "085": "Schuyler", "086": "Scott", "087": "Shelby", "088": "Stark", "089": "Stephenson", "090": "Tazewell",
+    "091": "Union", "092": "Vermilion", "093": "Wabash", "094": "Warren", "095": "Washington", "096": "Wayne",
+    "097": "White", "098": "Whiteside", "099": "Will", "100": "Williamson", "101": "Winnebago", "102": "Woodford",
+}
+
+# Region 65 holds the statewide row and the university lab schools
+
+STATEWIDE_REGION = "65"
+
+# How each column of the wide table is aggregated
+
+DEMOGRAPHIC_COLUMNS = [
+    "White (%)", "Black (%)", "Latine (%)", "Asian (%)",
+    "Native Hawaiian or Other Pacific Islander (%)",
+    "American Indian or Alaska Native (%)", "IEP (%)", "EL (%)", "Low Income (%)"
+]
+REVENUE_COLUMNS = [
+    "Local Property Taxes (%)", "Other Local Funding (%)",
+    "Evidence-Based Funding (%)", "Other State Funding (%)", "Federal Funding (%)"
+]
+POSITIONS = [
+    ("Core and Specialist Teachers", "Actual Core and Specialist Teachers Count (EIS)", "Core and Specialist Teachers Gap (EIS)"),
+    ("Special Education Teachers", "Actual Special Education Teachers Count (EIS)", "Special Education Teachers Gap (EIS)"),
+    ("EL Teachers", "Actual EL Teachers (EIS)", "EL Teachers Gap (EIS)"),
+    ("Counselors", "Actual Counselors Count (IRC)", "Counselors Gap (IRC)"),
+    ("Nurses", "Actual Nurses Count (IRC)", "Nurses Gap (IRC)"),
+    ("Psychologists", "Actual Psychologists Count (IRC)", "Psychologists Gap (IRC)"),
+    ("Principals", "Actual Principals Count (EIS)", "Principals Gap (EIS)"),
+    ("Assistant Principals", "Actual Assistant Principals Count (EIS)", "Assistant Principals Gap (EIS)"),
+]
+SUM_COLUMNS = (
+    ["School Count", "Total ASE", "Actual Resources", "Adequacy Target", "Adequacy Funding Gap"]
+    + [column for position, actual, gap in POSITIONS for column in (f"Adequate {position}", actual, gap)]
+)
+
+
+def parse_rcdts(rcdts):
+    """Split a Series of RCDTS codes into region, county and district codes"""
+    return pd.DataFrame({
+        "Region": rcdts.str[:2],
+        "County": rcdts.str[2:5],
+        "District": rcdts.str[5:9],
+    }, index=rcdts.index)
+
+
+def county_name(county_code):
+    """County name for a three digit county code, or None if it is not a county"""
+    name = ILLINOIS_COUNTIES.get(county_code)
+    return f"{name} County" if name else None
+
+
+def rollup_labels(codes):
+    """Name every region and county found in the parsed codes.
+
+    Regions are labelled with the counties they serve, e.g.
+    "Region 01 (Adams, Brown, Cass, Morgan, Pike, Scott)".
+    """
+    counties = {code: county_name(code) for code in codes["County"].unique()}
+    region_labels = {}
+    for region, county_codes in codes.groupby("Region")["County"].unique().items():
+        names = sorted(counties[code].removesuffix(" County") for code in county_codes if counties[code])
+        region_labels[region] = f"Region {region} ({', '.join(names)})"
+    return region_labels, counties
+
+
+def weighted_mean(values, weights, groups):
+    """Weighted mean of each column within groups, ignoring missing values"""
+    present = values.notna()
+    numerator = values.fillna(0).mul(weights, axis=0).groupby(groups).sum()
+    denominator = present.mul(weights, axis=0).groupby(groups).sum()
+    return numerator / denominator.replace(0, np.nan)
+
+
+def build_rollups(df):
+    """Aggregate districts to every region and county.
+
+    Returns rows shaped like the wide table (same columns), one per region and
+    county, so the app can show them the same way it shows a district. Counts,
+    dollars and position gaps are summed; Adequacy Level and demographics are
+    weighted by enrollment (Total ASE) and revenue shares by Actual Resources.
+    """
+    codes = parse_rcdts(df["RCDTS"])
+    districts = df[codes["Region"] != STATEWIDE_REGION]
+    codes = codes.loc[districts.index]
+    region_labels, counties = rollup_labels(codes)
+
+    # Stack each district once under its region and once under its county so a
+    # single groupby computes both levels
+
+    region_key = codes["Region"].map(region_labels)
+    county_key = codes["County"].map(counties)
+    in_county = county_key.notna()
+    stacked = pd.concat([districts, districts[in_county]], ignore_index=True)
+    groups = pd.concat([region_key, county_key[in_county]], ignore_index=True).rename("District Name (IRC)")
+
+    rollups = stacked[SUM_COLUMNS].groupby(groups).sum(min_count=1)
+    rollups = rollups.join(weighted_mean(stacked[DEMOGRAPHIC_COLUMNS + ["Adequacy Level"]], stacked["Total ASE"], groups))
+    rollups = rollups.join(weighted_mean(stacked[REVENUE_COLUMNS], stacked["Actual Resources"], groups))
+
+    # Per student and per school values follow the wide table's conventions
+    # (the per student gap is positive when a district is short of adequacy)
+
+    rollups["Adequacy Target Per Student"] = rollups["Adequacy Target"] / rollups["Total ASE"]
+    rollups["Adequacy Funding Gap Per Student"] = -rollups["Adequacy Funding Gap"] / rollups["Total ASE"]
+    school_count = rollups["School Count"].replace(0, np.nan)
+    rollups["Adequacy Funding Gap Per School"] = rollups["Adequacy Funding Gap"] / school_count
+    for position, actual, gap in POSITIONS:
+        rollups[f"{position} Gap Per School"] = rollups[gap] / school_count
+
+    # Synthetic RCDTS codes: region + zeros, or "00" + county + zeros
+
+    rollups = rollups.reset_index()
+    region_codes = {label: region for region, label in region_labels.items()}
+    county_codes = {label: code for code, label in counties.items() if label}
+    rollups["RCDTS"] = rollups["District Name (IRC)"].map(
+        lambda name: region_codes[name] + "0" * 11 if name in region_codes else "00" + county_codes[name] + "0" * 8
+    )
+
+    # Counties first, then regions, each alphabetically
+
+    rollups["is_region"] = rollups["District Name (IRC)"].isin(region_codes)
+    rollups = rollups.sort_values(["is_region", "District Name (IRC)"]).drop(columns="is_region")
+    return rollups[df.columns].reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write region and county rollups of the PEER app data.")
+    parser.add_argument("--out", required=True, help="output CSV path")
+    args = parser.parse_args()
+
+    from validate_data import live_data_files
+
+    rollups = build_rollups(pd.read_parquet(live_data_files()[0]))
+    rollups.to_csv(args.out, index=False)
+    print(f"Wrote {len(rollups):,} rollups to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
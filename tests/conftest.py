@@ -0,0 +1,39 @@
+import logging
+import os
+import sys
+import tempfile
+
+import pandas as pd
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from validate_data import live_data_files  # noqa: E402
+
+# Keep the app's view counts out of the app directory (see prewarm.py)
+
+os.environ.setdefault("PEER_ACCESS_STATS", os.path.join(tempfile.mkdtemp(), "access_stats.json"))
+
+
+@pytest.fixture(scope="session")
+def df():
+    return pd.read_parquet(live_data_files()[0])
+
+
+@pytest.fixture(scope="session")
+def df_leg():
+    return pd.read_csv(live_data_files()[1])
+
+
+def run_app(**params):
+    """Run peer_app.py once with Streamlit's AppTest, with the given query parameters"""
+    from streamlit.testing.v1 import AppTest
+
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    at = AppTest.from_file(os.path.join(APP_DIR, "peer_app.py"), default_timeout=120)
+    for param, value in params.items():
+        at.query_params[param] = value
+    at.run()
+    assert not at.exception, [exception.value for exception in at.exception]
+    return at
@@ -0,0 +1,35 @@
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+shapely = pytest.importorskip("shapely")
+
+import build_geometries
+from build_geometries import build_layer, load_geojson, read_boundaries
+
+
+def write_boundaries(path, field, values):
+    squares = [shapely.box(-91 + i, 40, -90.5 + i, 40.5) for i in range(len(values))]
+    gpd.GeoDataFrame({field: values}, geometry=squares, crs="EPSG:4326").to_file(path, driver="GeoJSON")
+    return path
+
+
+@pytest.mark.parametrize("values", [["0100100102600", "1506501629900"], [100100102600, 1506501629900]])
+def test_rcdts_keep_their_leading_zero(tmp_path, values):
+    keys, geometries = read_boundaries(write_boundaries(tmp_path / "districts.geojson", "RCDTS", values), "RCDTS")
+    assert keys.tolist() == ["0100100102600", "1506501629900"]
+    assert len(geometries) == 2
+
+
+def test_legislative_numbers_drop_their_leading_zero(tmp_path):
+    source = write_boundaries(tmp_path / "house.geojson", "DISTRICT", ["007", "118"])
+    keys, _ = read_boundaries(source, "DISTRICT", layer="house")
+    assert keys.tolist() == ["7", "118"]
+
+
+def test_region_01_district_joins_the_wide_table(df, tmp_path, monkeypatch):
+    # Payson CUSD 1, stored as a number the way some shapefiles keep RCDTS
+    monkeypatch.setattr(build_geometries, "GEOMETRY_DIR", str(tmp_path / "geometries"))
+    keys, geometries = read_boundaries(write_boundaries(tmp_path / "districts.geojson", "RCDTS", [100100102600]), "RCDTS")
+    build_layer("school_districts", keys, geometries)
+    ids = [feature["id"] for feature in load_geojson("school_districts", "statewide")["features"]]
+    assert df.set_index("RCDTS").loc[ids, "District Name (IRC)"].tolist() == ["Payson CUSD 1"]
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+shapely = pytest.importorskip("shapely")
+
+from build_leg_coverage import build_coverage
+
+
+def test_schools_are_split_by_the_districts_they_sit_in():
+    df = pd.DataFrame({"RCDTS": ["0100100102600", "0100100202600"],
+                       "District Name (IRC)": ["Payson CUSD 1", "Liberty CUSD 2"]})
+    schools = pd.DataFrame({
+        "RCDTS": ["010010010260001", "010010010260002", "010010020260001", "010010020260002"],
+        "Longitude": [-90.5, -89.5, -89.5, -89.49],
+        "Latitude": [40.5, 40.5, 40.5, np.nan],
+        "Enrollment": [300, 100, 200, 50],
+    })
+    # Two House districts side by side; the Senate district covers both
+    house = (np.array([7, 8]), [shapely.box(-91, 40, -90, 41), shapely.box(-90, 40, -89, 41)])
+    senate = (np.array([4]), [shapely.box(-91, 40, -89, 41)])
+    legislators = {("House", 7): "A. Rep", ("House", 8): "B. Rep", ("Senate", 4): "C. Sen"}
+
+    coverage, unassigned = build_coverage(schools, df, {"House": house, "Senate": senate}, legislators)
+    rows = coverage.set_index(["Chamber", "District Number", "RCDTS"])
+    assert rows["Share of Students"].to_dict() == {
+        ("Senate", 4, "0100100102600"): 1.0,
+        ("Senate", 4, "0100100202600"): 0.8,
+        ("House", 7, "0100100102600"): 0.75,
+        ("House", 8, "0100100102600"): 0.25,
+        ("House", 8, "0100100202600"): 0.8,
+    }
+    assert rows.loc[("House", 8, "0100100102600"), "Legislator Name"] == "B. Rep"
+    assert unassigned == {"House": 0, "Senate": 0}
@@ -0,0 +1,21 @@
+import pytest
+
+from conftest import run_app
+from views import district_view
+
+
+def comparison_funding(at):
+    return next(table.value for table in at.dataframe if "Gap Per Pupil" in table.value.index)
+
+
+def test_comparison_matches_the_district_page(df):
+    # The statewide row uses ISBE's statewide gaps, like the District Resource Needs tab
+    at = run_app(lite="0")
+    at.multiselect[0].select("Payson CUSD 1").run()
+    funding = comparison_funding(at)
+    for name in ["State of Illinois", "Payson CUSD 1"]:
+        payload = district_view(df[df["District Name (IRC)"] == name], name)
+        assert funding.loc["School Funding Gap", name] == pytest.approx(payload["gap"])
+        assert funding.loc["Gap Per Pupil", name] == pytest.approx(payload["gap_per_pupil"])
+        assert funding.loc["Needs Per Pupil", name] == pytest.approx(payload["adequate_per_pupil"])
+        assert funding.loc["Resources Per Pupil", name] == pytest.approx(payload["actual_per_pupil"])
@@ -0,0 +1,38 @@
+import pytest
+
+from conftest import run_app
+
+
+def widget_values(at):
+    return {widget.key: widget.value for widget in list(at.selectbox) + list(at.radio) if widget.key}
+
+
+@pytest.mark.parametrize("lite", ["0", "1"])
+def test_invalid_params_fall_back_to_defaults(lite):
+    defaults = widget_values(run_app(lite=lite))
+    at = run_app(lite=lite, district="Nowhere USD 0", filter="bogus", chamber="Assembly", leg_district="abc")
+    assert widget_values(at) == defaults
+    assert dict(at.query_params) == {"lite": lite}
+
+
+def test_invalid_legislator_falls_back_to_the_first():
+    at = run_app(lite="0", filter="legislator", legislator="Nobody")
+    values = widget_values(at)
+    assert values["leg_filter"] == "Legislator Name"
+    assert values["legislator"] == at.selectbox(key="legislator").options[0]
+    assert at.query_params["legislator"] == values["legislator"]
+
+
+def test_district_not_in_the_chamber_is_ignored():
+    at = run_app(lite="0", chamber="Senate", leg_district="100")
+    values = widget_values(at)
+    assert values["chamber"] == "Senate"
+    assert values["leg_district"] == 1
+    assert "leg_district" not in at.query_params
+
+
+def test_valid_params_select_the_view():
+    at = run_app(lite="0", district="Payson CUSD 1", chamber="House", leg_district="7")
+    values = widget_values(at)
+    assert (values["district"], values["chamber"], values["leg_district"]) == ("Payson CUSD 1", "House", 7)
+    assert dict(at.query_params) == {"district": "Payson CUSD 1", "leg_district": "7", "lite": "0"}
@@ -0,0 +1,32 @@
+import json
+
+import pytest
+
+from conftest import run_app
+from views import DISTRIBUTION_METRICS
+
+
+@pytest.fixture(scope="module")
+def app():
+    return run_app(lite="0")
+
+
+def distribution_chart(at):
+    figures = [json.loads(chart.proto.spec) for chart in at.get("plotly_chart")]
+    return next(figure for figure in figures if figure["data"][0].get("hovertemplate") == "%{y} districts<extra></extra>")
+
+
+@pytest.mark.parametrize("metric", list(DISTRIBUTION_METRICS))
+def test_state_is_not_highlighted(app, metric):
+    app.selectbox(key="district").select("State of Illinois").run()
+    app.selectbox(key="dist_metric").select(metric).run()
+    assert not [markdown.value for markdown in app.markdown if "is higher than" in markdown.value]
+    assert not distribution_chart(app)["layout"].get("shapes")
+
+
+def test_district_is_highlighted(app):
+    app.selectbox(key="district").select("Payson CUSD 1").run()
+    app.selectbox(key="dist_metric").select(list(DISTRIBUTION_METRICS)[0]).run()
+    sentences = [markdown.value for markdown in app.markdown if "is higher than" in markdown.value]
+    assert len(sentences) == 1 and sentences[0].startswith("Payson CUSD 1 is higher than")
+    assert len(distribution_chart(app)["layout"]["shapes"]) == 1
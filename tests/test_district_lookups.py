@@ -0,0 +1,38 @@
+import numpy as np
+
+from conftest import run_app
+
+# The similarity features in peer_app.py, spelled out so a change to them shows up here
+
+SIMILARITY_FEATURES = [
+    "White (%)", "Black (%)", "Latine (%)", "Asian (%)",
+    "Native Hawaiian or Other Pacific Islander (%)",
+    "American Indian or Alaska Native (%)", "IEP (%)", "EL (%)", "Low Income (%)",
+    "Local Property Taxes (%)", "Other Local Funding (%)",
+    "Evidence-Based Funding (%)", "Other State Funding (%)", "Federal Funding (%)",
+    "Total ASE", "Adequacy Level"
+]
+
+
+def shown_table(at, column):
+    return next(table.value for table in at.dataframe if column in table.value.columns)
+
+
+def test_similar_districts_are_the_nearest(df):
+    at = run_app(lite="0", district="Payson CUSD 1")
+    districts = df[df["District Name (IRC)"] != "State of Illinois"].set_index("District Name (IRC)")
+    features = districts[SIMILARITY_FEATURES].fillna(0).astype(float)
+    features["Total ASE"] = np.log1p(features["Total ASE"])
+    z = (features - features.mean()) / features.std(ddof=0).replace(0, 1)
+    distances = ((z - z.loc["Payson CUSD 1"]) ** 2).sum(axis=1).drop("Payson CUSD 1")
+    assert shown_table(at, "School District")["School District"].tolist() == distances.nsmallest(5).index.tolist()
+
+
+def test_legislators_cover_the_district(df, df_leg):
+    at = run_app(lite="0", district="Payson CUSD 1")
+    rcdts = df.loc[df["District Name (IRC)"] == "Payson CUSD 1", "RCDTS"].iloc[0]
+    coverage = df_leg[df_leg["RCDTS"] == rcdts].sort_values(["Chamber", "District Number"], ascending=[False, True])
+    shown = shown_table(at, "Legislator")
+    assert len(coverage) >= 2
+    assert shown["Legislator"].tolist() == coverage["Legislator Name"].tolist()
+    assert shown["Chamber"].tolist() == coverage["Chamber"].tolist()
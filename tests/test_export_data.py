@@ -0,0 +1,45 @@
+import io
+
+import pandas as pd
+import pytest
+
+from export_data import export_file_name, export_frame, iter_export_chunks
+
+
+def read_export(chunks, file_format):
+    data = io.BytesIO(b"".join(chunks))
+    return pd.read_csv(data) if file_format == "CSV" else pd.read_parquet(data)
+
+
+@pytest.mark.parametrize("file_format", ["CSV", "Parquet"])
+def test_statewide_round_trip(df, file_format):
+    # A chunk size that doesn't divide the row count, so the last chunk is short
+    result = read_export(iter_export_chunks(df, file_format, chunk_rows=100), file_format)
+    pd.testing.assert_frame_equal(result, df.reset_index(drop=True), check_dtype=file_format == "Parquet")
+
+
+@pytest.mark.parametrize("file_format", ["CSV", "Parquet"])
+def test_empty_export_keeps_the_columns(df, file_format):
+    result = read_export(iter_export_chunks(df.iloc[:0], file_format), file_format)
+    assert list(result.columns) == list(df.columns)
+    assert result.empty
+
+
+def test_legislative_export_joins_the_wide_table(df, df_leg):
+    coverage = df_leg[(df_leg["Chamber"] == "House") & (df_leg["District Number"] == 12)]
+    result = read_export(iter_export_chunks(export_frame(df, df_leg, "legislative", ("House", "12")), "Parquet"), "Parquet")
+    assert len(result) == len(coverage)
+    assert result["RCDTS"].astype(str).tolist() == coverage["RCDTS"].astype(str).tolist()
+    assert result["Adequacy Level"].notna().all()
+
+
+def test_unknown_scope_and_format(df, df_leg):
+    with pytest.raises(ValueError):
+        export_frame(df, df_leg, "county", "Cook County")
+    with pytest.raises(ValueError):
+        list(iter_export_chunks(df, "Excel"))
+
+
+def test_file_names():
+    assert export_file_name("district", "Payson CUSD 1", "CSV") == "peer_district_payson_cusd_1.csv"
+    assert export_file_name("statewide", None, "Parquet") == "peer_statewide.parquet"
@@ -0,0 +1,33 @@
+import pytest
+
+from conftest import run_app
+
+LEGISLATIVE_KEYS = ["leg_filter", "chamber", "leg_district", "legislator"]
+
+
+def selection(at):
+    widgets = {widget.key: widget.value for widget in list(at.selectbox) + list(at.radio)}
+    return {key: widgets[key] for key in LEGISLATIVE_KEYS if key in widgets}
+
+
+@pytest.mark.parametrize("params", [
+    {"chamber": "Senate", "leg_district": "5"},
+    {"filter": "legislator", "legislator": "Adriane Johnson"},
+])
+def test_lite_and_full_pages_read_the_same_link(params):
+    lite = run_app(lite="1", **params)
+    full = run_app(lite="0", **params)
+    assert selection(lite) == selection(full)
+    assert {**dict(lite.query_params), "lite": "0"} == dict(full.query_params)
+
+
+def test_selection_carries_over_to_the_full_page():
+    at = run_app(lite="1")
+    at.selectbox(key="chamber").select("Senate").run()
+    at.selectbox(key="leg_district").select(5).run()
+    chosen = selection(at)
+    at.button(key="full_version_button").click().run()
+    assert not at.exception
+    assert "funding_toggle_button" in [button.key for button in at.button]  # the full page is showing
+    assert selection(at) == chosen == {"leg_filter": "Chamber & District", "chamber": "Senate", "leg_district": 5}
+    assert at.query_params["chamber"] == "Senate" and at.query_params["leg_district"] == "5"
@@ -0,0 +1,36 @@
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from multiworker import KEEP_VERSIONS, data_plane_files, prepare_data_plane, read_data_plane
+
+
+def test_data_plane_frames_match_the_tables(df, df_leg, tmp_path):
+    # Including the index, which the data plane doesn't store
+    plane_df, plane_df_leg = read_data_plane(data_plane_files(prepare_data_plane(tmp_path)))
+    pd.testing.assert_frame_equal(plane_df, df, check_dtype=False)
+    pd.testing.assert_frame_equal(plane_df_leg, df_leg, check_dtype=False)
+
+
+def test_rebuild_switches_both_files_at_once(df, tmp_path):
+    prepare_data_plane(tmp_path)
+    first = data_plane_files(tmp_path)
+    mapped_df, _ = read_data_plane(first)
+
+    for _ in range(KEEP_VERSIONS):
+        prepare_data_plane(tmp_path)
+    files = data_plane_files(tmp_path)
+    assert os.path.dirname(files["df"]) == os.path.dirname(files["df_leg"]) != os.path.dirname(first["df"])
+    assert len([entry for entry in os.scandir(tmp_path) if entry.is_dir()]) == KEEP_VERSIONS
+
+    # A worker still on the deleted first build keeps its mapping
+    assert not os.path.exists(first["df"])
+    assert mapped_df["Adequacy Funding Gap"].sum() == pytest.approx(df["Adequacy Funding Gap"].sum())
+
+
+def test_missing_data_plane(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        data_plane_files(tmp_path)
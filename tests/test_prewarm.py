@@ -0,0 +1,40 @@
+import json
+
+from conftest import run_app
+from prewarm import AccessStats, prewarm, view_key
+
+
+def test_counts_are_merged_into_the_file(tmp_path):
+    path = tmp_path / "access_stats.json"
+    first, second = AccessStats(path), AccessStats(path)
+    for stats, key in [(first, view_key("district", "Payson CUSD 1")), (second, view_key("district", "Payson CUSD 1")),
+                       (second, view_key("legislative", "House", 12))]:
+        stats.record(key)
+    first.flush()
+    second.flush()
+    hottest, total = AccessStats(path).hottest(1)
+    assert hottest == [(view_key("district", "Payson CUSD 1"), 2)]
+    assert total == 3
+
+
+def test_prewarm_renders_the_hottest_views(tmp_path):
+    stats = AccessStats(tmp_path / "access_stats.json")
+    for key, count in [("a", 5), ("b", 3), ("c", 2)]:
+        for _ in range(count):
+            stats.record(json.dumps([key]))
+    rendered = []
+
+    def render(key):
+        if key == json.dumps(["b"]):
+            raise ValueError(key)
+        rendered.append(key)
+
+    result = prewarm(stats, render, always=[json.dumps(["default"])], n=2)
+    assert sorted(rendered) == sorted([json.dumps(["default"]), json.dumps(["a"])])
+    assert (result["views"], result["failures"], result["coverage"]) == (3, 1, 0.8)
+    assert stats.read()["last_prewarm"] == result
+
+
+def test_warmup_session_stops_after_starting_the_prewarm():
+    at = run_app(warmup="1")
+    assert not at.tabs and not at.selectbox
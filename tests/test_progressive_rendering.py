@@ -0,0 +1,22 @@
+from conftest import run_app
+
+
+def page_tables(at):
+    return [table.value for table in at.dataframe]
+
+
+def test_changing_district_redraws_every_section():
+    # The second run cancels or replaces the first run's section inputs
+    at = run_app(lite="0", district="Payson CUSD 1")
+    at.selectbox(key="district").select("Cass SD 63").run()
+    assert not at.exception
+    fresh = run_app(lite="0", district="Cass SD 63")
+    for shown, expected in zip(page_tables(at), page_tables(fresh), strict=True):
+        assert shown.equals(expected)
+
+
+def test_state_page_skips_the_district_sections():
+    at = run_app(lite="0", district="State of Illinois")
+    texts = [text.value for text in at.text]
+    assert "Select a school district to see districts with similar students, revenue sources and funding." in texts
+    assert not any("Students (ASE)" in table.columns for table in page_tables(at))
@@ -0,0 +1,41 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from regression_check import data_hash, differences, golden_path, run_chunk
+
+# Views compared per stage (python regression_check.py check compares all of them
+# and checks the time and memory budgets)
+
+SAMPLE_VIEWS = 60
+
+
+def golden_sample(stage):
+    path = golden_path(data_hash(), stage)
+    if not os.path.exists(path):
+        pytest.skip("no golden snapshots for this data version (python regression_check.py record)")
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        golden = json.load(f)
+    keys = sorted(golden)
+    sample = keys[::max(1, len(keys) // SAMPLE_VIEWS)]
+    if stage == "district_view":
+        sample += [key for key in [json.dumps("State of Illinois")] if key not in sample]
+    return {key: golden[key] for key in sample}
+
+
+@pytest.mark.parametrize("stage", ["district_view", "legislative_view"])
+def test_views_match_golden_snapshots(stage):
+    golden = golden_sample(stage)
+    current = run_chunk(stage, [json.loads(key) for key in golden])
+    found = list(differences(golden, current))
+    assert not found, found[:20]
+
+
+def test_a_changed_view_is_caught():
+    golden = golden_sample("district_view")
+    key = json.dumps("State of Illinois")
+    current = run_chunk("district_view", ["State of Illinois"])
+    current[key]["gap_per_pupil"] += 1
+    assert [path for path, _, _ in differences({key: golden[key]}, current)] == [f"/{key}/gap_per_pupil"]
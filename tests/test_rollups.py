@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from rollups import ILLINOIS_COUNTIES, STATEWIDE_REGION, build_rollups, county_name, parse_rcdts, rollup_labels
+
+
+def test_county_codes_are_numbered_in_order():
+    assert list(ILLINOIS_COUNTIES) == [f"{code:03d}" for code in range(1, 103)]
+
+
+@pytest.mark.parametrize("code, name", [
+    ("001", "Adams County"),
+    ("016", "Cook County"),
+    ("055", "Macon County"),
+    ("056", "Macoupin County"),
+    ("057", "Madison County"),
+    ("062", "McDonough County"),
+    ("063", "McHenry County"),
+    ("064", "McLean County"),
+    ("102", "Woodford County"),
+])
+def test_county_name(code, name):
+    assert county_name(code) == name
+
+
+@pytest.mark.parametrize("code", ["000", "103", "999"])
+def test_county_name_outside_the_counties(code):
+    assert county_name(code) is None
+
+
+def test_rollup_labels():
+    codes = parse_rcdts(pd.Series(["0100100000000", "0100500000000", "1706400000000", "6500000000000"]))
+    region_labels, counties = rollup_labels(codes)
+    assert region_labels == {
+        "01": "Region 01 (Adams, Brown)",
+        "17": "Region 17 (McLean)",
+        "65": "Region 65 ()",
+    }
+    assert counties == {"001": "Adams County", "005": "Brown County", "064": "McLean County", "000": None}
+
+
+def test_regions_add_up_to_their_districts(df):
+    # Region 65 (the statewide row and the university lab schools) isn't rolled up
+    rollups = build_rollups(df)
+    districts = df[parse_rcdts(df["RCDTS"])["Region"] != STATEWIDE_REGION]
+    regions = rollups[rollups["District Name (IRC)"].str.startswith("Region ")]
+    assert regions["Adequacy Funding Gap"].sum() == pytest.approx(districts["Adequacy Funding Gap"].sum())
+    assert regions["Total ASE"].sum() == pytest.approx(districts["Total ASE"].sum())
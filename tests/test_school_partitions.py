@@ -0,0 +1,25 @@
+import os
+
+import pandas as pd
+
+from build_school_partitions import build_partitions, school_partition_path
+
+
+def schools_frame(names):
+    return pd.DataFrame({
+        "RCDTS": list(names),
+        "School Name": list(names.values()),
+    })
+
+
+def test_rebuild_replaces_the_old_districts(tmp_path):
+    school_dir = str(tmp_path / "schools")
+    payson, cass = "010010010260001", "170090090260001"
+    assert build_partitions(schools_frame({payson: "Seymour Elem", cass: "Cass Elem"}), school_dir) == 2
+
+    assert build_partitions(schools_frame({payson: "Payson Elem"}), school_dir) == 1
+    rebuilt = pd.read_parquet(school_partition_path(payson, school_dir))
+    assert rebuilt["School Name"].tolist() == ["Payson Elem"]
+    assert not os.path.exists(school_partition_path(cass, school_dir))
+    # Neither the new build's nor the old directory is left behind
+    assert sorted(os.listdir(tmp_path)) == ["schools"]
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+import rollups
+from validate_data import COVERAGE_FILE, KEEP_RELEASES, WIDE_FILE, live_data_files, publish, validate
+
+
+def failed_checks(result):
+    """{check: examples} for every failing check"""
+    return {check["check"]: check["examples"] for check in result["checks"] if check["failures"]}
+
+
+def test_live_data_passes(df, df_leg):
+    result = validate(df, df_leg)
+    assert result["passed"], failed_checks(result)
+    assert result["errors"] == 0
+
+
+def test_swapped_county_codes_fail(df, df_leg, monkeypatch):
+    monkeypatch.setitem(rollups.ILLINOIS_COUNTIES, "063", "McLean")
+    monkeypatch.setitem(rollups.ILLINOIS_COUNTIES, "064", "McHenry")
+    result = validate(df, df_leg)
+    assert not result["passed"]
+    assert "county_rollup_name" in failed_checks(result)
+
+
+def test_duplicate_rcdts_fails(df, df_leg):
+    broken = df.copy()
+    broken.loc[broken.index[1], "RCDTS"] = broken["RCDTS"].iloc[0]
+    assert "rcdts_unique" in failed_checks(validate(broken, df_leg))
+
+
+def test_wrong_funding_gap_names_the_district(df, df_leg):
+    broken = df.copy()
+    row = broken.index[broken["District Name (IRC)"] == "Payson CUSD 1"][0]
+    broken.loc[row, "Adequacy Funding Gap"] += 1000
+    failures = failed_checks(validate(broken, df_leg))
+    assert failures["funding_gap"] == ["Payson CUSD 1"]
+    assert failures["gap_per_student"] == ["Payson CUSD 1"]
+
+
+def test_missing_column_stops_the_wide_checks(df, df_leg):
+    result = validate(df.drop(columns="Total ASE"), df_leg)
+    assert not result["passed"]
+    assert "wide_columns" in failed_checks(result)
+    assert not any(check["check"] == "enrollment_positive" for check in result["checks"])
+
+
+@pytest.mark.parametrize("column, value, check", [
+    ("Share of Students", 1.5, "coverage_share_range"),
+    ("District Number", 200, "coverage_district_number"),
+    ("RCDTS", "9999999999999", "coverage_rcdts_join"),
+])
+def test_bad_coverage_row_fails(df, df_leg, column, value, check):
+    broken = df_leg.astype({column: object}).copy()
+    broken.loc[broken.index[0], column] = value
+    assert check in failed_checks(validate(df, broken))
+
+
+def test_publish_swaps_both_tables_at_once(tmp_path):
+    wide, coverage = tmp_path / "wide.parquet", tmp_path / "coverage.csv"
+    releases = tmp_path / "releases"
+    assert live_data_files(releases) == (WIDE_FILE, COVERAGE_FILE)
+
+    for refresh in range(KEEP_RELEASES + 1):
+        wide.write_text(f"wide {refresh}")
+        coverage.write_text(f"coverage {refresh}")
+        release = publish(wide, coverage, releases)
+        live_wide, live_coverage = live_data_files(releases)
+        assert os.path.dirname(live_wide) == os.path.dirname(live_coverage) == release
+        assert (open(live_wide).read(), open(live_coverage).read()) == (f"wide {refresh}", f"coverage {refresh}")
+
+    assert len([entry for entry in os.scandir(releases) if entry.is_dir()]) == KEEP_RELEASES
@@ -0,0 +1,20 @@
+import os
+
+import streamlit as st
+
+from conftest import run_app
+from prewarm import ACCESS_STATS_FILE
+
+VIEW_CACHE_VERSION_FILE = os.path.join(os.path.dirname(ACCESS_STATS_FILE), "view_cache_version")
+
+
+def test_new_data_version_is_recorded_once_cleared():
+    # AppTest keeps cache_data in memory, so this checks the version bookkeeping;
+    # the persisted files are removed by the same .clear() calls under a server
+    run_app(lite="1")
+    current = open(VIEW_CACHE_VERSION_FILE).read()
+    with open(VIEW_CACHE_VERSION_FILE, "w") as f:
+        f.write("stale")
+    st.cache_resource.clear()
+    run_app(lite="1")
+    assert open(VIEW_CACHE_VERSION_FILE).read() == current
@@ -0,0 +1,330 @@
+# PEER app data validation
+# Checks a data refresh (the wide table and the legislative district coverage
+# table) before the app serves it. Every check is a vectorized pass over a whole
+# table. Errors block publication; warnings are reported only.
+#
+# Publishing copies both tables into a new directory under releases/ and then
+# points releases/current at it, so the app never sees one table from a refresh
+# with the other from before it. Until something is published, the tables in the
+# app directory are the live ones.
+#
+# Usage: python validate_data.py                                  # check the live files
+#        python validate_data.py --wide new/app_data_wide.parquet --coverage new/leg_dist_coverage.csv \
+#                                --report validation.json --publish
+# Exits with status 1 if any error check fails.
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from rollups import DEMOGRAPHIC_COLUMNS, ILLINOIS_COUNTIES, POSITIONS, REVENUE_COLUMNS, county_name, parse_rcdts
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+WIDE_FILE = os.path.join(APP_DIR, "app_data_wide.parquet")
+COVERAGE_FILE = os.path.join(APP_DIR, "leg_dist_coverage.csv")
+
+# Published releases, the file naming the live one, and releases kept (older
+# ones are deleted; a process still reading one keeps its open files)
+
+RELEASE_DIR = os.path.join(APP_DIR, "releases")
+KEEP_RELEASES = 3
+
+STATEWIDE_NAME = "State of Illinois"
+RACE_COLUMNS = DEMOGRAPHIC_COLUMNS[:6]
+COVERAGE_COLUMNS = ["Chamber", "District Number", "School District", "RCDTS", "Legislator Name", "Total Students", "Share of Students"]
+CHAMBER_SEATS = {"House": 118, "Senate": 59}
+
+# Tolerances: dollars, staff positions and shares
+
+DOLLAR_TOLERANCE = 1.0
+POSITION_TOLERANCE = 0.01
+SHARE_TOLERANCE = 0.01
+COVERAGE_SHARE_TOLERANCE = 0.02
+
+# Failing keys listed per check in the report
+
+MAX_EXAMPLES = 10
+
+# District names that carry their county's name ("McLean County USD 5", "Pope Co CUD 1")
+
+COUNTY_IN_NAME = re.compile(r"\b(" + "|".join(re.escape(name) for name in ILLINOIS_COUNTIES.values()) + r") Co(unty)?\b")
+
+
+class Report:
+    """Collects check results"""
+
+    def __init__(self):
+        self.checks = []
+
+    def add(self, name, severity, description, failed, keys=None):
+        """Record a check. failed is a boolean mask over keys, or a single bool."""
+        if np.ndim(failed) == 0:
+            failures, examples = int(bool(failed)), []
+        else:
+            failed = np.asarray(failed, dtype=bool)
+            failures = int(failed.sum())
+            examples = [str(key) for key in np.asarray(keys)[failed][:MAX_EXAMPLES]]
+        self.checks.append({
+            "check": name,
+            "severity": severity,
+            "description": description,
+            "failures": failures,
+            "examples": examples,
+        })
+
+    def count(self, severity):
+        return sum(1 for check in self.checks if check["severity"] == severity and check["failures"])
+
+    def to_dict(self):
+        return {"passed": self.count("error") == 0, "errors": self.count("error"),
+                "warnings": self.count("warning"), "checks": self.checks}
+
+
+def mismatch(values, expected, tolerance):
+    """True where values and expected differ by more than tolerance (both missing is a match)"""
+    values = np.asarray(values, dtype=float)
+    expected = np.asarray(expected, dtype=float)
+    both_missing = np.isnan(values) & np.isnan(expected)
+    return ~(np.isclose(values, expected, rtol=0, atol=tolerance) | both_missing)
+
+
+def check_wide(df, report):
+    """Checks on the wide table (one row per district plus the statewide row)"""
+    required = ["RCDTS", "District Name (IRC)", "School Count", "Total ASE", "Actual Resources", "Adequacy Target",
+                "Adequacy Target Per Student", "Adequacy Funding Gap", "Adequacy Funding Gap Per Student",
+                "Adequacy Level", "Adequacy Funding Gap Per School"] + DEMOGRAPHIC_COLUMNS + REVENUE_COLUMNS + [
+                column for position, actual, gap in POSITIONS
+                for column in (f"Adequate {position}", actual, gap, f"{position} Gap Per School")]
+    missing = [column for column in required if column not in df.columns]
+    report.add("wide_columns", "error", f"wide table has every column the app reads (missing: {missing})", bool(missing))
+    if missing:
+        return
+
+    rcdts = df["RCDTS"].astype(str)
+    names = df["District Name (IRC)"]
+    statewide = (names == STATEWIDE_NAME).to_numpy()
+    districts = ~statewide
+
+    # Keys
+
+    report.add("wide_not_empty", "error", "wide table has district rows", districts.sum() == 0)
+    report.add("rcdts_format", "error", "RCDTS is 13 digits or capital letters",
+               ~rcdts.str.fullmatch(r"[0-9A-Z]{13}").to_numpy(), rcdts)
+    report.add("rcdts_unique", "error", "RCDTS appears once", rcdts.duplicated(keep=False).to_numpy(), rcdts)
+    report.add("district_name_unique", "error", "district names appear once (the app selects districts by name)",
+               names.duplicated(keep=False).to_numpy() | names.isna().to_numpy(), names)
+    report.add("statewide_row", "error", f"exactly one {STATEWIDE_NAME} row", statewide.sum() != 1)
+    report.add("enrollment_positive", "error", "Total ASE is positive (per pupil values divide by it)",
+               ~(df["Total ASE"] > 0).to_numpy(), names)
+
+    # Shares: every (%) column is a fraction, race groups sum to at most 1 (the
+    # Report Card's other groups aren't columns) and revenue sources sum to 1
+
+    percent = df[DEMOGRAPHIC_COLUMNS + REVENUE_COLUMNS].to_numpy(dtype=float)
+    report.add("share_range", "error", "percentage columns are between 0 and 1",
+               ((percent < 0) | (percent > 1)).any(axis=1), names)
+    race_total = df[RACE_COLUMNS].sum(axis=1, min_count=1).to_numpy()
+    report.add("race_share_sum", "error", "race and ethnicity shares sum to at most 1",
+               race_total > 1 + SHARE_TOLERANCE, names)
+    revenue = df[REVENUE_COLUMNS].to_numpy(dtype=float)
+    revenue_missing = np.isnan(revenue).all(axis=1)
+    report.add("revenue_share_sum", "error", "revenue source shares sum to 1",
+               ~revenue_missing & mismatch(np.nansum(revenue, axis=1), 1, SHARE_TOLERANCE), names)
+    report.add("revenue_missing", "warning", "revenue sources are reported", revenue_missing & districts, names)
+
+    # Gap arithmetic. The statewide row's gaps are ISBE's sums of district gaps,
+    # so they are not actual minus adequate.
+
+    actual = df["Actual Resources"]
+    target = df["Adequacy Target"]
+    gap = df["Adequacy Funding Gap"]
+    ase = df["Total ASE"].where(df["Total ASE"] > 0)
+    schools = df["School Count"].where(df["School Count"] > 0)
+    report.add("adequacy_level", "error", "Adequacy Level is actual resources / adequacy target",
+               mismatch(df["Adequacy Level"], actual / target, 0.001), names)
+    report.add("funding_gap", "error", "funding gap is actual resources - adequacy target",
+               districts & mismatch(gap, actual - target, DOLLAR_TOLERANCE), names)
+    report.add("target_per_student", "error", "target per student is adequacy target / ASE",
+               districts & mismatch(df["Adequacy Target Per Student"], target / ase, DOLLAR_TOLERANCE), names)
+    report.add("gap_per_student", "error", "gap per student is -funding gap / ASE",
+               districts & mismatch(df["Adequacy Funding Gap Per Student"], -gap / ase, DOLLAR_TOLERANCE), names)
+    report.add("gap_per_school", "error", "funding gap per school is funding gap / school count",
+               districts & mismatch(df["Adequacy Funding Gap Per School"], gap / schools, DOLLAR_TOLERANCE), names)
+
+    # All positions at once: one (rows x positions) array per quantity
+
+    adequate_staff = df[[f"Adequate {position}" for position, _, _ in POSITIONS]].to_numpy(dtype=float)
+    actual_staff = df[[actual_column for _, actual_column, _ in POSITIONS]].to_numpy(dtype=float)
+    staff_gap = df[[gap_column for _, _, gap_column in POSITIONS]].to_numpy(dtype=float)
+    staff_gap_per_school = df[[f"{position} Gap Per School" for position, _, _ in POSITIONS]].to_numpy(dtype=float)
+    reported = ~np.isnan(actual_staff)
+    report.add("position_gap", "error", "each reported position gap is actual - adequate staff",
+               districts & (reported & mismatch(staff_gap, actual_staff - adequate_staff, POSITION_TOLERANCE)).any(axis=1), names)
+    report.add("position_gap_per_school", "error", "each position gap per school is position gap / school count",
+               districts & mismatch(staff_gap_per_school, staff_gap / schools.to_numpy()[:, None], POSITION_TOLERANCE).any(axis=1), names)
+    report.add("position_actual_missing", "warning", "actual staff counts are reported for every position",
+               districts & ~reported.all(axis=1), names)
+
+    # County rollups: a district named after a county rolls up under that county
+    # (catches county codes mapped to the wrong names)
+
+    named_county = names.str.extract(COUNTY_IN_NAME)[0] + " County"
+    rollup_county = parse_rcdts(rcdts)["County"].map(county_name)
+    report.add("county_rollup_name", "error", "districts named after a county roll up under that county",
+               (named_county.notna() & (named_county != rollup_county)).to_numpy(), names)
+
+
+def check_coverage(df_leg, df, report):
+    """Checks on the legislative district coverage table and its join to the wide table"""
+    missing = [column for column in COVERAGE_COLUMNS if column not in df_leg.columns]
+    report.add("coverage_columns", "error", f"coverage table has every column the app reads (missing: {missing})", bool(missing))
+    if missing or "RCDTS" not in df.columns:
+        return
+
+    chamber = df_leg["Chamber"]
+    number = pd.to_numeric(df_leg["District Number"], errors="coerce")
+    rcdts = df_leg["RCDTS"].astype(str)
+    keys = chamber.astype(str) + " " + number.astype(str) + " / " + rcdts
+    share = df_leg["Share of Students"]
+
+    report.add("coverage_key_unique", "error", "each (Chamber, District Number, RCDTS) appears once",
+               df_leg.duplicated(["Chamber", "District Number", "RCDTS"], keep=False).to_numpy(), keys)
+    seats = chamber.map(CHAMBER_SEATS)
+    report.add("coverage_district_number", "error", "Chamber is House or Senate and the district number exists",
+               ~((number >= 1) & (number <= seats)).to_numpy(), keys)
+    report.add("coverage_share_range", "error", "Share of Students is between 0 and 1",
+               ~((share >= 0) & (share <= 1)).to_numpy(), keys)
+    report.add("coverage_rcdts_join", "error", "every covered RCDTS is in the wide table",
+               ~rcdts.isin(df["RCDTS"].astype(str)).to_numpy(), keys)
+
+    # Per legislative district: one legislator, and every seat present
+
+    legislators = df_leg.groupby(["Chamber", "District Number"])["Legislator Name"].nunique()
+    report.add("coverage_one_legislator", "error", "each legislative district has one legislator",
+               (legislators != 1).to_numpy(), legislators.index.map(lambda key: f"{key[0]} {key[1]}"))
+    seats_present = pd.MultiIndex.from_tuples(
+        [(name, seat) for name, count in CHAMBER_SEATS.items() for seat in range(1, count + 1)])
+    absent = ~seats_present.isin(legislators.index)
+    report.add("coverage_all_seats", "error", "every House and Senate district is covered",
+               absent, seats_present.map(lambda key: f"{key[0]} {key[1]}"))
+
+    # Known gaps in the Directory of Educational Entities (see todo.md) show up as
+    # districts whose shares don't add up, so these are warnings
+
+    share_sums = df_leg.groupby(["RCDTS", "Chamber"])["Share of Students"].sum()
+    report.add("coverage_share_sum", "warning", "a district's shares sum to 1 within each chamber",
+               mismatch(share_sums, 1, COVERAGE_SHARE_TOLERANCE), share_sums.index.map(lambda key: f"{key[0]} {key[1]}"))
+    wide_names = rcdts.map(df.drop_duplicates("RCDTS").set_index("RCDTS")["District Name (IRC)"])
+    report.add("coverage_district_name", "warning", "School District matches the wide table's district name",
+               (wide_names.notna() & (wide_names != df_leg["School District"])).to_numpy(), keys)
+    districts = df[df["District Name (IRC)"] != STATEWIDE_NAME]
+    report.add("districts_covered", "warning", "every district is in at least one legislative district",
+               ~districts["RCDTS"].isin(df_leg["RCDTS"]).to_numpy(), districts["District Name (IRC)"])
+
+
+def validate(df, df_leg):
+    """Run every check and return the report as a dict"""
+    start = time.perf_counter()
+    report = Report()
+    check_wide(df, report)
+    check_coverage(df_leg, df, report)
+    result = report.to_dict()
+    result["seconds"] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def current_release(release_dir):
+    """Directory of the live release under release_dir, or None if none was published"""
+    try:
+        with open(os.path.join(release_dir, "current")) as f:
+            return os.path.join(release_dir, f.read().strip())
+    except FileNotFoundError:
+        return None
+
+
+def new_release(release_dir):
+    """Create an empty, not yet live, release directory under release_dir"""
+    os.makedirs(release_dir, exist_ok=True)
+    release = tempfile.mkdtemp(dir=release_dir, prefix=time.strftime("%Y%m%d-%H%M%S-"))
+    os.chmod(release, 0o755)
+    return release
+
+
+def activate_release(release_dir, release, keep=KEEP_RELEASES):
+    """Make release the live one with a single rename of the pointer file, then
+    delete all but the keep most recent releases"""
+    fd, tmp_path = tempfile.mkstemp(dir=release_dir, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write(os.path.basename(release))
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, os.path.join(release_dir, "current"))
+
+    older = sorted((entry for entry in os.scandir(release_dir) if entry.is_dir() and entry.path != release),
+                   key=lambda entry: entry.stat().st_mtime_ns)
+    for entry in older[:max(0, len(older) - (keep - 1))]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def live_data_files(release_dir=RELEASE_DIR):
+    """(wide table, coverage table) paths of the live data. The pointer is read once,
+    so both paths are from the same release."""
+    release = current_release(release_dir)
+    if release is None:
+        return WIDE_FILE, COVERAGE_FILE
+    return os.path.join(release, os.path.basename(WIDE_FILE)), os.path.join(release, os.path.basename(COVERAGE_FILE))
+
+
+def publish(wide, coverage, release_dir=RELEASE_DIR):
+    """Copy validated tables into a new release and make it the live one. Returns the
+    release directory."""
+    release = new_release(release_dir)
+    for source, target in [(wide, WIDE_FILE), (coverage, COVERAGE_FILE)]:
+        shutil.copyfile(source, os.path.join(release, os.path.basename(target)))
+        shutil.copymode(source, os.path.join(release, os.path.basename(target)))
+    activate_release(release_dir, release)
+    return release
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate PEER app data and publish it if it passes.")
+    live_wide, live_coverage = live_data_files()
+    parser.add_argument("--wide", default=live_wide, help="wide table (Parquet, default: the live one)")
+    parser.add_argument("--coverage", default=live_coverage, help="legislative district coverage table (CSV, default: the live one)")
+    parser.add_argument("--report", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--publish", action="store_true", help="replace the live data files if there are no errors")
+    args = parser.parse_args()
+
+    df = pd.read_parquet(args.wide)
+    df_leg = pd.read_csv(args.coverage)
+    result = validate(df, df_leg)
+    result["files"] = {"wide": args.wide, "coverage": args.coverage}
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(result, f, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
+
+    for check in result["checks"]:
+        if check["failures"]:
+            print(f"{check['severity'].upper():7} {check['check']}: {check['failures']:,} failing ({check['description']})", file=sys.stderr)
+    print(f"{result['errors']} error(s), {result['warnings']} warning(s) in {result['seconds'] * 1000:.0f} ms", file=sys.stderr)
+
+    if not result["passed"]:
+        if args.publish:
+            print("Not published.", file=sys.stderr)
+        sys.exit(1)
+    if args.publish:
+        print(f"Published {publish(args.wide, args.coverage)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+# PEER app view payloads
+# The values each page view shows, computed with pandas and numpy only (no Streamlit calls).
+# peer_app.py caches them per data version and view parameters, so a shared link
+# is computed once; scripts can import this module to get the same numbers.
+
+import numpy as np
+import pandas as pd
+
+# ISBE's statewide funding gap. The statewide gap is the sum of district gaps,
+# so it is shown instead of needs minus resources.
+
+ILLINOIS_FUNDING_GAP = -5679275708
+
+# Options of the "Select Resource Type" drop down in the staffing expander
+
+STAFFING_RESOURCES = [
+    "Core and Specialist Teachers",
+    "Special Education Teachers",
+    "Counselors",
+    "Nurses",
+    "Psychologists",
+    "Principals",
+    "Assistant Principals",
+    "EL Teachers"
+]
+
+# Melt data into long format for charts and drop down menus.
+
+def calculate_funding_metrics(df_filtered):
+    
+    # EBF adequacy
+    
+    df_adequacy = pd.melt(
+        df_filtered,
+        id_vars=["RCDTS","District Name (IRC)","Total ASE"],
+        value_vars=[
+            "Adequacy Target",
+            "Adequacy Target Per Student",
+            "Adequate Core and Specialist Teachers",
+            "Adequate Special Education Teachers",
+            "Adequate Counselors",
+            "Adequate Nurses",
+            "Adequate Psychologists",
+            "Adequate Principals",
+            "Adequate Assistant Principals",
+            "Adequate EL Teachers"
+            ],
+            var_name="Resource",
+            value_name="Adequate resources"
+            )
+    df_adequacy["Resource"] = df_adequacy["Resource"].str.replace("Adequate ", "", regex=False)
+    df_adequacy["Resource"] = df_adequacy["Resource"].str.replace("Adequacy Target", "Total Resources (Dollar Amount)", regex=False)
+    df_adequacy["Resource"] = df_adequacy["Resource"].str.replace("Adequate Target Per Student", "Total Resources Per Student (Dollar Amount)", regex=False)
+    
+    # Actual resources 
+
+    df_actual = pd.melt(
+        df_filtered,
+        id_vars=["RCDTS", "Total ASE"],
+        value_vars=[
+            "Actual Resources",
+            "Actual Core and Specialist Teachers Count (EIS)",
+            "Actual Special Education Teachers Count (EIS)",
+            "Actual Counselors Count (IRC)",
+            "Actual Nurses Count (IRC)",
+            "Actual Psychologists Count (IRC)",
+            "Actual Principals Count (EIS)",
+            "Actual Assistant Principals Count (EIS)",
+            "Actual EL Teachers (EIS)"
+        ],
+        var_name="Resource",
+        value_name="Actual"
+        )
+    df_actual["Resource"] = df_actual["Resource"].str.replace("Actual ", "", regex=False)
+    df_actual["Resource"] = df_actual["Resource"].str.replace(" Count (EIS)", "", regex=False)
+    df_actual["Resource"] = df_actual["Resource"].str.replace(" (EIS)", "", regex=False)
+    df_actual["Resource"] = df_actual["Resource"].str.replace(" Count (IRC)", "", regex=False)
+    df_actual["Resource"] = df_actual["Resource"].str.replace("Resources", "Total Resources (Dollar Amount)", regex=False)
+    df_actual["Resource"] = df_actual["Resource"].str.replace("Resources Per Student", "Total Resources Per Student (Dollar Amount)", regex=False)
+    
+    # Adequacy gaps
+
+    df_gaps = pd.melt(
+        df_filtered,
+        id_vars=["RCDTS", "Total ASE"],
+        value_vars=[
+             "Adequacy Funding Gap",
+            "Adequacy Funding Gap Per Student",
+            "Core and Specialist Teachers Gap (EIS)",
+            "Special Education Teachers Gap (EIS)",
+            "Counselors Gap (IRC)",
+            "Nurses Gap (IRC)",
+            "Psychologists Gap (IRC)",
+            "Principals Gap (EIS)",
+            "Assistant Principals Gap (EIS)",
+            "EL Teachers Gap (EIS)"
+        ],
+        var_name="Resource",
+        value_name="Gaps"
+        )
+    df_gaps["Resource"] = df_gaps["Resource"].str.replace("Adequacy Funding Gap", "Total Resources (Dollar Amount)", regex=False)
+    df_gaps["Resource"] = df_gaps["Resource"].str.replace("Adequacy Funding Gap Per Student", "Total Resources Per Student (Dollar Amount)", regex=False)
+    df_gaps["Resource"] = df_gaps["Resource"].str.replace(" Gap (EIS)", "", regex=False)
+    df_gaps["Resource"] = df_gaps["Resource"].str.replace(" Gap (IRC)", "", regex=False)
+
+    illinois_negative_gap_sum = df_gaps["Gaps"].min()   
+
+    # Adequacy gaps per school
+
+    df_gaps_perschool = pd.melt(
+        df_filtered,
+        id_vars=["RCDTS", "Total ASE"],
+        value_vars=[
+             "Adequacy Funding Gap Per School",
+            "Core and Specialist Teachers Gap Per School",
+            "Special Education Teachers Gap Per School",
+            "Counselors Gap Per School",
+            "Nurses Gap Per School",
+            "Psychologists Gap Per School",
+            "Principals Gap Per School",
+            "Assistant Principals Gap Per School",
+            "EL Teachers Gap Per School"
+        ],
+        var_name="Resource",
+        value_name="Gaps Per School"
+        )
+    df_gaps_perschool["Resource"] = df_gaps_perschool["Resource"].str.replace(" Gap Per School", "", regex=False)
+
+
+    illinois_negative_gap_sum_perschool = df_gaps["Gaps"].min()     
+
+    # Merge adequacy and actuals
+
+    df_merged = pd.merge(
+        df_adequacy,
+        df_actual,
+        on=["RCDTS", "Resource", "Total ASE"],
+        how="left"
+    )
+
+    # Merge gaps
+
+    df_merged = pd.merge(
+        df_merged,
+        df_gaps,
+        on=["RCDTS", "Resource", "Total ASE"],
+        how="left"
+    )
+
+    # Merge gaps per school
+
+    df_merged = pd.merge(
+        df_merged,
+        df_gaps_perschool,
+        on=["RCDTS", "Resource", "Total ASE"],
+        how="left"
+    )
+
+    # Demographics melt
+
+    df_demographics = pd.melt(
+    df_filtered,
+    id_vars=["RCDTS", "District Name (IRC)", "Total ASE"],
+    value_vars=[
+        "White (%)", "Black (%)", "Latine (%)", "Asian (%)",
+        "Native Hawaiian or Other Pacific Islander (%)",
+        "American Indian or Alaska Native (%)","IEP (%)", "EL (%)", "Low Income (%)"
+    ],
+    var_name="Demographic Group",
+    value_name="Demographic Percentages"
+    )
+
+    # Demographics column name formatting
+
+    df_demographics["Demographic Group"] = df_demographics["Demographic Group"].str.replace(" (%)", "", regex=False)
+
+    # Revenue melt
+
+    df_revenue = pd.melt(
+        df_filtered,
+        id_vars=["RCDTS"],
+        value_vars=[
+             "Local Property Taxes (%)", "Other Local Funding (%)", 
+            "Evidence-Based Funding (%)", "Other State Funding (%)", 
+            "Federal Funding (%)"
+        ],
+        var_name="Revenue Source",
+        value_name="Revenue Percentages"
+        )
+    
+    # Revenue column name formatting
+
+    df_revenue["Revenue Source"] = df_revenue["Revenue Source"].str.replace(" (%)", "", regex=False)
+
+    # Resource filter formatting
+
+    resource_filter = "Total Resources (Dollar Amount)"
+    df_resource = df_merged[df_merged["Resource"] == resource_filter]
+    
+    # Get the actual and adequate resources variables
+    
+    actual_resources = df_resource["Actual"].iloc[0]
+    adequate_resources = df_resource["Adequate resources"].iloc[0]
+    ase = df_resource["Total ASE"].iloc[0]
+    
+    return actual_resources, adequate_resources, ase, df_merged, df_demographics, df_revenue, illinois_negative_gap_sum, illinois_negative_gap_sum_perschool
+
+
+
+def district_view(df_filtered, district_name):
+    """Everything the District Resource Needs tab shows for one district (or rollup).
+
+    Both the total and per pupil dollar values are included, along with the
+    staffing gap for every resource type, so the per pupil toggle and resource
+    drop down don't change the payload.
+    """
+    actual_resources, adequate_resources, ase, df_merged, df_demographics, df_revenue, illinois_negative_gap_sum, illinois_negative_gap_sum_perschool = calculate_funding_metrics(df_filtered)
+
+    # Calculate per pupil values
+
+    actual_per_pupil = actual_resources / ase if ase > 0 else 0
+    adequate_per_pupil = adequate_resources / ase if ase > 0 else 0
+    if district_name == "State of Illinois":
+        gap_per_pupil = illinois_negative_gap_sum / ase if ase > 0 else 0
+        gap = ILLINOIS_FUNDING_GAP
+    else:
+        gap_per_pupil = actual_per_pupil - adequate_per_pupil
+        gap = actual_resources - adequate_resources
+
+    # Adequacy gap and gap per school for each resource type
+
+    staffing = {}
+    for resource in STAFFING_RESOURCES:
+        df_resource = df_merged[df_merged["Resource"] == resource]
+        staffing[resource] = {
+            "gap": df_resource["Gaps"].iloc[0] if not df_resource.empty else 0,
+            "gap_per_school": df_resource["Gaps Per School"].iloc[0] if not df_resource.empty else 0
+        }
+
+    return {
+        "district": district_name,
+        "adequacy_level": df_filtered["Adequacy Level"].unique()[0],
+        "ase": ase,
+        "adequate": adequate_resources,
+        "actual": actual_resources,
+        "gap": gap,
+        "adequate_per_pupil": adequate_per_pupil,
+        "actual_per_pupil": actual_per_pupil,
+        "gap_per_pupil": gap_per_pupil,
+        "staffing": staffing,
+        "df_demographics": df_demographics,
+        "df_revenue": df_revenue
+    }
+
+
+def staffing_sentence(payload, resource, is_rollup=False):
+    """Staffing text for one resource type from a district_view payload"""
+    district_name = payload["district"]
+    adequacy_gap = payload["staffing"][resource]["gap"]
+    adequacy_gap_per_school = payload["staffing"][resource]["gap_per_school"]
+    resource_type = resource.lower()
+    if district_name == "State of Illinois":
+        if adequacy_gap >= 0:  # Positive gap (adequately staffed)
+            return f"According to the EBF formula, Illinois schools are adequately staffed with {resource_type}, but this may not reflect the on the ground needs at your school."
+        return f"A fully funded EBF formula could mean {abs(adequacy_gap):,.0f} more {resource_type} in Illinois."
+    if is_rollup:  # County or region
+        if adequacy_gap_per_school >= 0:
+            return f"According to the EBF formula, school districts in {district_name} are adequately staffed with {resource_type}, but this may not reflect the on the ground needs at your school."
+        return f"A fully funded EBF formula could mean {abs(adequacy_gap_per_school):.2f} more {resource_type} per school in {district_name}."
+    if adequacy_gap_per_school >= 0:  # Positive gap (adequately staffed)
+        return f"According to the EBF formula, your school district is adequately staffed with {resource_type}, but this may not reflect the on the ground needs at your school."
+    return f"A fully funded EBF formula could mean {abs(adequacy_gap_per_school):.2f} more {resource_type} per school in your district."
+
+
+def school_view(df_schools, payload):
+    """Tables for a district's schools (from build_school_partitions.py) and its
+    staffing gaps per school (from a district_view payload).
+
+    Staff columns are only present when the school files were built with an EIS
+    extract.
+    """
+    positions = [resource for resource in STAFFING_RESOURCES if resource in df_schools.columns]
+    df_school_staffing = df_schools[["School Name", "School Type", "Enrollment"] + positions]
+    df_school_demo = df_schools[["School Name"] + [column for column in df_schools.columns if column.endswith("(%)")]]
+    df_school_demo.columns = df_school_demo.columns.str.replace(" (%)", "", regex=False)
+
+    # The district's gap for each position, in total and per school, next to the
+    # staff its schools report on average
+
+    df_position_gaps = pd.DataFrame({
+        "Position": STAFFING_RESOURCES,
+        "District Gap": [payload["staffing"][resource]["gap"] for resource in STAFFING_RESOURCES],
+        "Gap Per School": [payload["staffing"][resource]["gap_per_school"] for resource in STAFFING_RESOURCES],
+        "Staff Per School": [df_schools[resource].mean() if resource in positions else float("nan") for resource in STAFFING_RESOURCES]
+    })
+
+    return {
+        "df_school_staffing": df_school_staffing,
+        "df_school_demo": df_school_demo,
+        "df_position_gaps": df_position_gaps
+    }
+
+
+# Distribution charts: metrics compared across every district, with the column
+# each comes from and its axis (d3) and text (Python) formats
+
+DISTRIBUTION_METRICS = {
+    "Adequacy Level": ("Adequacy Level", ".0%", "{:.0%}"),
+    "Funding Gap Per Student": ("Adequacy Funding Gap Per Student", "$,.0f", "${:,.0f}"),
+    **{f"{resource} Gap Per School": (f"{resource} Gap Per School", ",.1f", "{:,.2f}") for resource in STAFFING_RESOURCES}
+}
+DISTRIBUTION_BINS = 30
+DISTRIBUTION_QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+
+
+def distribution_summary(df, bins=DISTRIBUTION_BINS):
+    """Histogram bins and quantiles of every distribution metric across districts.
+
+    Bins span the 1st to 99th percentile; districts beyond it are counted in the
+    end bins. The sorted values are kept for percentile ranks.
+    """
+    districts = df[df["District Name (IRC)"] != "State of Illinois"]
+    columns = [column for column, _, _ in DISTRIBUTION_METRICS.values()]
+    values = districts[columns].to_numpy(dtype=float)
+    ranges = np.nanquantile(values, [0.01, 0.99], axis=0)
+    quantiles = np.nanquantile(values, DISTRIBUTION_QUANTILES, axis=0)
+
+    summary = {}
+    for i, label in enumerate(DISTRIBUTION_METRICS):
+        column_values = np.sort(values[~np.isnan(values[:, i]), i])
+        low, high = ranges[:, i]
+        counts, edges = np.histogram(np.clip(column_values, low, high), bins=bins, range=(low, high))
+        summary[label] = {
+            "counts": counts,
+            "edges": edges,
+            "quantiles": dict(zip(DISTRIBUTION_QUANTILES, quantiles[:, i])),
+            "values": column_values
+        }
+    return summary
+
+
+def percentile_rank(distribution, value):
+    """Share of districts with a value below value"""
+    return np.searchsorted(distribution["values"], value, side="left") / len(distribution["values"])
+
+
+def legislative_view(df, df_leg, chamber=None, district_number=None, legislator=None):
+    """Tables the Legislative View tab shows for a legislative district or a legislator.
+
+    Pass chamber and district_number, or legislator.
+    """
+    if legislator is None:
+        filtered_df = df_leg[(df_leg['Chamber'] == chamber) & (df_leg['District Number'] == district_number)]
+        title = f"📊 {filtered_df['Legislator Name'].values[0]} ({chamber} District {district_number})"
+    else:
+        filtered_df = df_leg[df_leg['Legislator Name'] == legislator]
+        legislator_info = filtered_df.iloc[0]
+        title = f"📊 {legislator} ({legislator_info['Chamber']} District {legislator_info['District Number']})"
+
+    df_leg_view = filtered_df.merge(df,on="RCDTS",how="left")
+
+    df_schools = df_leg_view[['School District','Total Students','Share of Students']]
+
+    df_adequacy_stats = df_leg_view[['School District','Adequacy Funding Gap',
+                            'Adequacy Funding Gap Per Student',
+                            'Adequacy Level']]
+
+    df_adequacy_pos = df_leg_view[['School District','Core and Specialist Teachers Gap (EIS)',
+                          'Special Education Teachers Gap (EIS)', 
+                          'Counselors Gap (IRC)',
+                          'Nurses Gap (IRC)', 
+                          'Psychologists Gap (IRC)', 
+                          'Principals Gap (EIS)',
+                          'Assistant Principals Gap (EIS)', 
+                          'EL Teachers Gap (EIS)']]
+
+    df_adequacy_pos.columns = ['School District',
+                               'Core and Specialist Teachers',
+                               'Special Education Teachers', 
+                               'Counselors',
+                               'Nurses', 
+                               'Psychologists', 
+                               'Principals',
+                               'Assistant Principals', 
+                               'EL Teachers']
+
+    df_demo = df_leg_view[['School District',
+                  'White (%)',
+                  'Black (%)',
+                  'Latine (%)',
+                  'Asian (%)',
+                  'Native Hawaiian or Other Pacific Islander (%)',
+                  'American Indian or Alaska Native (%)',
+                  'IEP (%)',
+                  'EL (%)',
+                  'Low Income (%)']]
+
+    df_demo.columns = ['School District',
+                  'White',
+                  'Black',
+                  'Latine',
+                  'Asian',
+                  'Native Hawaiian or Other Pacific Islander',
+                  'American Indian or Alaska Native',
+                  'IEP',
+                  'EL',
+                  'Low Income']
+
+    df_rev = df_leg_view[['School District',
+                  'Local Property Taxes (%)', 
+                  'Other Local Funding (%)',
+                  'Evidence-Based Funding (%)', 
+                  'Other State Funding (%)',
+                  'Federal Funding (%)']]
+
+    df_rev.columns = ['School District',
+                  'Local Property Taxes', 
+                  'Other Local Funding',
+                  'Evidence-Based Funding', 
+                  'Other State Funding',
+                  'Federal Funding']
+
+    return {
+        "title": title,
+        "df_leg_view": df_leg_view,
+        "df_schools": df_schools,
+        "df_adequacy_stats": df_adequacy_stats,
+        "df_adequacy_pos": df_adequacy_pos,
+        "df_demo": df_demo,
+        "df_rev": df_rev
+    }